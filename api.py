@@ -0,0 +1,152 @@
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pyarrow as pa
+
+from artifacts import load_artifacts
+from helper import (warm_derived, fetch_medal_tally, yearwise_medal_tally, country_event_heatmap,
+                    most_successful, data_over_time)
+from loader import load_dataset
+from memo import DEFAULT_MEMO_ENTRIES, DEFAULT_MEMO_MB, MemoCache
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8502
+
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+JSON_TYPE = 'application/json'
+
+REQUIRED = 'required'
+
+# Endpoints by path: the helper function and its query parameters, with the
+# default of each and how its value is parsed
+ENDPOINTS = {
+    'medal_tally': (fetch_medal_tally, {'year': ('Overall', str), 'country': ('Overall', str)}),
+    'yearwise_medal_tally': (yearwise_medal_tally, {'country': (REQUIRED, str)}),
+    'country_event_heatmap': (country_event_heatmap, {'country': (REQUIRED, str)}),
+    'most_successful': (most_successful, {'sport': ('Overall', str)}),
+    'data_over_time': (data_over_time, {'col': (REQUIRED, str), 'error': (None, float)}),
+}
+
+
+class QueryError(ValueError):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_params(endpoint, query):
+    # Helper arguments from the query string values, in signature order
+    if endpoint not in ENDPOINTS:
+        raise QueryError(404, f'unknown endpoint {endpoint!r}')
+    spec = ENDPOINTS[endpoint][1]
+    unknown = set(query) - set(spec) - {'format'}
+    if unknown:
+        raise QueryError(400, f"unknown parameters: {', '.join(sorted(unknown))}")
+
+    args = []
+    for name, (default, parse) in spec.items():
+        if name in query:
+            try:
+                args.append(parse(query[name]))
+            except ValueError:
+                raise QueryError(400, f'invalid {name}: {query[name]!r}') from None
+        elif default is REQUIRED:
+            raise QueryError(400, f'missing parameter {name!r}')
+        else:
+            args.append(default)
+    return tuple(args)
+
+
+def _frame_bytes(frame, fmt):
+    # A result frame as an Arrow IPC stream or as JSON records
+    frame = frame.reset_index() if frame.index.name is not None else frame
+    frame = frame.rename(columns=str)
+    if fmt == 'arrow':
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return ARROW_TYPE, sink.getvalue().to_pybytes()
+    return JSON_TYPE, frame.to_json(orient='records').encode()
+
+
+class QueryService:
+    # The helper queries over one resident dataset, without Streamlit. Encoded
+    # results are cached per endpoint, arguments and format; the dataset's
+    # derived tables are shared by every request thread, and concurrent misses
+    # of one query are encoded once.
+
+    def __init__(self, df, cache_size=DEFAULT_MEMO_ENTRIES, cache_mb=DEFAULT_MEMO_MB, cache_ttl=None):
+        self.df = df
+        self.cache = MemoCache(max_entries=cache_size, max_bytes=int(cache_mb * 2 ** 20), ttl=cache_ttl)
+
+    def query(self, endpoint, **params):
+        # The helper's result frame, e.g. query('medal_tally', year='2016')
+        args = _parse_params(endpoint, {name: str(value) for name, value in params.items()})
+        return ENDPOINTS[endpoint][0](self.df, *args)
+
+    def _encode(self, endpoint, args, fmt):
+        try:
+            frame = ENDPOINTS[endpoint][0](self.df, *args)
+        except (KeyError, ValueError) as e:
+            raise QueryError(400, f'{endpoint} failed: {e}') from None
+        return _frame_bytes(frame, fmt)
+
+    def respond(self, path, query, accept=''):
+        # Content type and body for a GET of path with the parsed query string
+        endpoint = path.strip('/')
+        if endpoint == '_cache':
+            timings = json.loads(self.cache.timings().to_json(orient='records'))
+            return JSON_TYPE, json.dumps({'stats': self.cache.stats(), 'timings': timings}).encode()
+        if not endpoint:
+            index = {name: {param: default for param, (default, _) in spec.items()}
+                     for name, (_, spec) in ENDPOINTS.items()}
+            return JSON_TYPE, json.dumps(index).encode()
+
+        fmt = query.get('format') or ('arrow' if ARROW_TYPE in accept else 'json')
+        if fmt not in ('arrow', 'json'):
+            raise QueryError(400, f'unknown format {fmt!r}')
+        key = endpoint, _parse_params(endpoint, query), fmt
+        return self.cache.compute(key, self._encode, *key)
+
+
+def make_handler(service):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            try:
+                content_type, body = service.respond(url.path, query, self.headers.get('Accept', ''))
+                status = 200
+            except QueryError as e:
+                content_type, body, status = JSON_TYPE, json.dumps({'error': str(e)}).encode(), e.status
+            except Exception as e:
+                self.log_error('%s failed: %r', self.path, e)
+                content_type, body, status = JSON_TYPE, json.dumps({'error': 'internal error'}).encode(), 500
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return QueryHandler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the helper queries as JSON or Arrow over HTTP')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MEMO_ENTRIES,
+                        help='encoded results kept in memory')
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_MEMO_MB,
+                        help='megabytes of encoded results kept in memory')
+    parser.add_argument('--cache-ttl', type=float, help='seconds an encoded result is served before recomputing')
+    args = parser.parse_args()
+
+    query_service = QueryService(warm_derived(load_artifacts(load_dataset())), args.cache_size, args.cache_mb,
+                                 args.cache_ttl)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(query_service))
+    print(f'Serving on http://{args.host}:{args.port}/')
+    server.serve_forever()
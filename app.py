@@ -1,9 +1,17 @@
+import os
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from helper import preprocess_data, medal_tally, country_year_list, fetch_medal_tally, data_over_time, most_successful, yearwise_medal_tally, country_event_heatmap, most_successful_countrywise
+import plotly.express as px
+from loader import load_dataset, source_fingerprint
+from artifacts import load_artifacts
+from profiling import RenderProfile
+from memo import helper_cache, memoize
+from render import figure_cache, lazy_tabs, show_figure
+from helper import BODY_BIN_CM, BODY_BIN_KG, warm_derived, medal_tally, country_year_list, fetch_medal_tally, data_over_time, overall_summary, most_successful, yearwise_medal_tally, country_event_heatmap, country_comparison, most_successful_countrywise, country_profile, age_distribution, age_summary, top_athletes, height_weight, gender_participation, athlete_rows
 
 # Define medal colors
 MEDAL_COLORS = {
@@ -158,13 +166,60 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load and preprocess data
+# The preprocessed frame is cached once per server process and shared by all
+# sessions; the source fingerprint in the key reloads it when the CSVs change
+@st.cache_resource(max_entries=1, show_spinner="Loading Olympic data...")
+def load_cached_data(fingerprint):
+    return warm_derived(load_artifacts(load_dataset()))
+
 def load_data():
-    athlete_df = pd.read_csv('athlete_events.csv')
-    noc_df = pd.read_csv('noc_regions.csv')
-    df = preprocess_data(athlete_df, noc_df)
-    return df
+    return load_cached_data(source_fingerprint())
+
+# Set OLYMPICS_DISTINCT_ERROR (e.g. 0.01) to estimate the per-year participation
+# counts with HyperLogLog sketches of that relative error instead of counting
+# every distinct value exactly; the headline counts stay exact
+DISTINCT_ERROR_ENV = 'OLYMPICS_DISTINCT_ERROR'
+distinct_error = float(os.environ[DISTINCT_ERROR_ENV]) if os.environ.get(DISTINCT_ERROR_ENV) else None
+
+# Sports with more measured athletes than this are drawn as binned counts
+# instead of one marker per athlete
+SCATTER_POINTS_ENV = 'OLYMPICS_SCATTER_MAX_POINTS'
+DEFAULT_SCATTER_POINTS = 2000
+scatter_max_points = int(os.environ.get(SCATTER_POINTS_ENV, DEFAULT_SCATTER_POINTS))
+
+# Countries shown at once in the comparison heatmaps
+MAX_COMPARED_COUNTRIES = 4
 
-df = load_data()
+# Opt-in timing of data loading, helper calls and figures (OLYMPICS_PROFILE=1 or ?profile=1)
+profile = RenderProfile()
+
+with profile.section('load_data', kind='data'):
+    df = load_data()
+data_version = df.attrs.get('fingerprint')
+
+# Charts are served from the shared figure cache, keyed by the draw function,
+# its filter arguments and the dataset version; draw() only runs on a miss
+def show_chart(draw, *args):
+    show_figure((draw.__name__, *args, data_version), draw, profile)
+
+# Helper results are memoized process-wide by arguments and dataset version
+# (sized with OLYMPICS_MEMO_ENTRIES, OLYMPICS_MEMO_MB and OLYMPICS_MEMO_TTL);
+# the profile times the cached call
+medal_tally = profile.wrap(memoize(medal_tally))
+country_year_list = profile.wrap(memoize(country_year_list))
+fetch_medal_tally = profile.wrap(memoize(fetch_medal_tally))
+data_over_time = profile.wrap(memoize(data_over_time))
+overall_summary = profile.wrap(memoize(overall_summary))
+most_successful = profile.wrap(memoize(most_successful))
+yearwise_medal_tally = profile.wrap(memoize(yearwise_medal_tally))
+country_event_heatmap = profile.wrap(memoize(country_event_heatmap))
+country_comparison = profile.wrap(memoize(country_comparison))
+most_successful_countrywise = profile.wrap(memoize(most_successful_countrywise))
+country_profile = profile.wrap(memoize(country_profile))
+age_distribution = profile.wrap(memoize(age_distribution))
+top_athletes = profile.wrap(memoize(top_athletes))
+height_weight = profile.wrap(memoize(height_weight))
+gender_participation = profile.wrap(memoize(gender_participation))
 
 # Sidebar with improved styling
 with st.sidebar:
@@ -197,6 +252,8 @@ with st.sidebar:
         key='menu_selection'
     )
 
+profile.page = user_menu
+
 # Main content with improved layout
 if user_menu == 'Medal Tally':
     # Custom header with medal icon
@@ -227,10 +284,11 @@ if user_menu == 'Medal Tally':
     if selected_year == 'Overall' and selected_country == 'Overall':
         st.subheader("Global Medal Distribution")
         
-        # Create tabs for different visualizations
-        tab1, tab2, tab3, tab4 = st.tabs(["Medal Table", "Medal Distribution", "Medal Type Analysis", "Regional Analysis"])
+        # Create tabs for different visualizations; only the selected one is built
+        selected_tab = lazy_tabs(["Medal Table", "Medal Distribution", "Medal Type Analysis", "Regional Analysis"],
+                                 key='medal_tally_tab')
         
-        with tab1:
+        if selected_tab == "Medal Table":
             # Medal statistics header
             st.markdown("""
             <div class="medal-stats">
@@ -330,48 +388,54 @@ if user_menu == 'Medal Tally':
             st.write(f"**Most Silver Medals:** {filtered_df['Silver'].max()} 🥈")
             st.write(f"**Most Bronze Medals:** {filtered_df['Bronze'].max()} 🥉")
             
-        with tab2:
+        elif selected_tab == "Medal Distribution":
             st.markdown("### Medal Distribution by Country")
             
             # Create pie chart
-            fig, ax = plt.subplots(figsize=(10, 8))
-            ax.pie(medal_tally_df['Total'], labels=medal_tally_df['region'], 
-                  autopct='%1.1f%%', textprops={'fontsize': 8})
-            ax.set_title('Medal Distribution by Country')
-            st.pyplot(fig)
+            def draw_country_share():
+                fig, ax = plt.subplots(figsize=(10, 8))
+                ax.pie(medal_tally_df['Total'], labels=medal_tally_df['region'], 
+                      autopct='%1.1f%%', textprops={'fontsize': 8})
+                ax.set_title('Medal Distribution by Country')
+                return fig
+            show_chart(draw_country_share, selected_year, selected_country)
             
             # Create bar chart for top 10 countries
-            top_10 = medal_tally_df.head(10)
-            fig, ax = plt.subplots(figsize=(12, 6))
-            bars = ax.bar(top_10['region'], top_10['Total'])
-            ax.bar_label(bars)
-            ax.set_title('Top 10 Countries by Total Medals')
-            ax.set_xlabel('Country')
-            ax.set_ylabel('Total Medals')
-            plt.xticks(rotation=45, ha='right')
-            st.pyplot(fig)
+            def draw_top_countries():
+                top_10 = medal_tally_df.head(10)
+                fig, ax = plt.subplots(figsize=(12, 6))
+                bars = ax.bar(top_10['region'], top_10['Total'])
+                ax.bar_label(bars)
+                ax.set_title('Top 10 Countries by Total Medals')
+                ax.set_xlabel('Country')
+                ax.set_ylabel('Total Medals')
+                plt.xticks(rotation=45, ha='right')
+                return fig
+            show_chart(draw_top_countries, selected_year, selected_country)
             
-        with tab3:
+        elif selected_tab == "Medal Type Analysis":
             st.markdown("### Medal Type Analysis")
             
             # Create stacked bar chart for medal types
-            fig, ax = plt.subplots(figsize=(12, 6))
-            medal_types = medal_tally_df[['Gold', 'Silver', 'Bronze']].head(10)
+            def draw_medal_types():
+                fig, ax = plt.subplots(figsize=(12, 6))
+                medal_types = medal_tally_df[['Gold', 'Silver', 'Bronze']].head(10)
             
-            # Plot stacked bars
-            ax.bar(medal_tally_df['region'].head(10), medal_types['Gold'], label='Gold', color='gold')
-            ax.bar(medal_tally_df['region'].head(10), medal_types['Silver'], 
-                  bottom=medal_types['Gold'], label='Silver', color='silver')
-            ax.bar(medal_tally_df['region'].head(10), medal_types['Bronze'], 
-                  bottom=medal_types['Gold'] + medal_types['Silver'], 
-                  label='Bronze', color='peru')
+                # Plot stacked bars
+                ax.bar(medal_tally_df['region'].head(10), medal_types['Gold'], label='Gold', color='gold')
+                ax.bar(medal_tally_df['region'].head(10), medal_types['Silver'], 
+                      bottom=medal_types['Gold'], label='Silver', color='silver')
+                ax.bar(medal_tally_df['region'].head(10), medal_types['Bronze'], 
+                      bottom=medal_types['Gold'] + medal_types['Silver'], 
+                      label='Bronze', color='peru')
             
-            ax.set_title('Medal Type Distribution for Top 10 Countries')
-            ax.set_xlabel('Country')
-            ax.set_ylabel('Number of Medals')
-            plt.xticks(rotation=45, ha='right')
-            ax.legend(title='Medal Type')
-            st.pyplot(fig)
+                ax.set_title('Medal Type Distribution for Top 10 Countries')
+                ax.set_xlabel('Country')
+                ax.set_ylabel('Number of Medals')
+                plt.xticks(rotation=45, ha='right')
+                ax.legend(title='Medal Type')
+                return fig
+            show_chart(draw_medal_types, selected_year, selected_country)
             
             # Create medal type ratio analysis
             medal_tally_df['Gold_Ratio'] = medal_tally_df['Gold'] / medal_tally_df['Total']
@@ -381,119 +445,41 @@ if user_menu == 'Medal Tally':
             st.markdown("### Medal Type Ratios")
             st.dataframe(medal_tally_df[['region', 'Gold_Ratio', 'Silver_Ratio', 'Bronze_Ratio']].head(10))
             
-        with tab4:
+        elif selected_tab == "Regional Analysis":
             st.markdown("### Regional Analysis")
             
             # Group by continent (assuming 'region' contains continent information)
             continent_tally = medal_tally_df.groupby('region').sum().reset_index()
             
             # Create continent-wise medal distribution
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.bar(continent_tally['region'], continent_tally['Total'])
-            ax.set_title('Medal Distribution by Continent')
-            ax.set_xlabel('Continent')
-            ax.set_ylabel('Total Medals')
-            plt.xticks(rotation=45, ha='right')
-            st.pyplot(fig)
+            def draw_continent_totals():
+                fig, ax = plt.subplots(figsize=(12, 6))
+                ax.bar(continent_tally['region'], continent_tally['Total'])
+                ax.set_title('Medal Distribution by Continent')
+                ax.set_xlabel('Continent')
+                ax.set_ylabel('Total Medals')
+                plt.xticks(rotation=45, ha='right')
+                return fig
+            show_chart(draw_continent_totals, selected_year, selected_country)
             
             # Create continent-wise medal type distribution
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.bar(continent_tally['region'], continent_tally['Gold'], label='Gold', color='gold')
-            ax.bar(continent_tally['region'], continent_tally['Silver'], 
-                  bottom=continent_tally['Gold'], label='Silver', color='silver')
-            ax.bar(continent_tally['region'], continent_tally['Bronze'], 
-                  bottom=continent_tally['Gold'] + continent_tally['Silver'], 
-                  label='Bronze', color='peru')
+            def draw_continent_types():
+                fig, ax = plt.subplots(figsize=(12, 6))
+                ax.bar(continent_tally['region'], continent_tally['Gold'], label='Gold', color='gold')
+                ax.bar(continent_tally['region'], continent_tally['Silver'], 
+                      bottom=continent_tally['Gold'], label='Silver', color='silver')
+                ax.bar(continent_tally['region'], continent_tally['Bronze'], 
+                      bottom=continent_tally['Gold'] + continent_tally['Silver'], 
+                      label='Bronze', color='peru')
             
-            ax.set_title('Medal Type Distribution by Continent')
-            ax.set_xlabel('Continent')
-            ax.set_ylabel('Number of Medals')
-            plt.xticks(rotation=45, ha='right')
-            ax.legend(title='Medal Type')
-            st.pyplot(fig)
+                ax.set_title('Medal Type Distribution by Continent')
+                ax.set_xlabel('Continent')
+                ax.set_ylabel('Number of Medals')
+                plt.xticks(rotation=45, ha='right')
+                ax.legend(title='Medal Type')
+                return fig
+            show_chart(draw_continent_types, selected_year, selected_country)
         
-        with tab1:
-            st.markdown("### Medal Distribution by Country")
-            
-            # Create pie chart
-            fig, ax = plt.subplots(figsize=(10, 8))
-            ax.pie(medal_tally_df['Total'], labels=medal_tally_df['region'], 
-                  autopct='%1.1f%%', textprops={'fontsize': 8})
-            ax.set_title('Medal Distribution by Country')
-            st.pyplot(fig)
-            
-            # Create bar chart for top 10 countries
-            top_10 = medal_tally_df.head(10)
-            fig, ax = plt.subplots(figsize=(12, 6))
-            bars = ax.bar(top_10['region'], top_10['Total'])
-            ax.bar_label(bars)
-            ax.set_title('Top 10 Countries by Total Medals')
-            ax.set_xlabel('Country')
-            ax.set_ylabel('Total Medals')
-            plt.xticks(rotation=45, ha='right')
-            st.pyplot(fig)
-            
-        with tab2:
-            st.markdown("### Medal Type Analysis")
-            
-            # Create stacked bar chart for medal types
-            fig, ax = plt.subplots(figsize=(12, 6))
-            medal_types = medal_tally_df[['Gold', 'Silver', 'Bronze']].head(10)
-            
-            # Plot stacked bars
-            ax.bar(medal_tally_df['region'].head(10), medal_types['Gold'], label='Gold', color='gold')
-            ax.bar(medal_tally_df['region'].head(10), medal_types['Silver'], 
-                  bottom=medal_types['Gold'], label='Silver', color='silver')
-            ax.bar(medal_tally_df['region'].head(10), medal_types['Bronze'], 
-                  bottom=medal_types['Gold'] + medal_types['Silver'], 
-                  label='Bronze', color='peru')
-            
-            ax.set_title('Medal Type Distribution for Top 10 Countries')
-            ax.set_xlabel('Country')
-            ax.set_ylabel('Number of Medals')
-            plt.xticks(rotation=45, ha='right')
-            ax.legend(title='Medal Type')
-            st.pyplot(fig)
-            
-            # Create medal type ratio analysis
-            medal_tally_df['Gold_Ratio'] = medal_tally_df['Gold'] / medal_tally_df['Total']
-            medal_tally_df['Silver_Ratio'] = medal_tally_df['Silver'] / medal_tally_df['Total']
-            medal_tally_df['Bronze_Ratio'] = medal_tally_df['Bronze'] / medal_tally_df['Total']
-            
-            st.markdown("### Medal Type Ratios")
-            st.dataframe(medal_tally_df[['region', 'Gold_Ratio', 'Silver_Ratio', 'Bronze_Ratio']].head(10))
-            
-        with tab3:
-            st.markdown("### Regional Analysis")
-            
-            # Group by continent (assuming 'region' contains continent information)
-            continent_tally = medal_tally_df.groupby('region').sum().reset_index()
-            
-            # Create continent-wise medal distribution
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.bar(continent_tally['region'], continent_tally['Total'])
-            ax.set_title('Medal Distribution by Continent')
-            ax.set_xlabel('Continent')
-            ax.set_ylabel('Total Medals')
-            plt.xticks(rotation=45, ha='right')
-            st.pyplot(fig)
-            
-            # Create continent-wise medal type distribution
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.bar(continent_tally['region'], continent_tally['Gold'], label='Gold', color='gold')
-            ax.bar(continent_tally['region'], continent_tally['Silver'], 
-                  bottom=continent_tally['Gold'], label='Silver', color='silver')
-            ax.bar(continent_tally['region'], continent_tally['Bronze'], 
-                  bottom=continent_tally['Gold'] + continent_tally['Silver'], 
-                  label='Bronze', color='peru')
-            
-            ax.set_title('Medal Type Distribution by Continent')
-            ax.set_xlabel('Continent')
-            ax.set_ylabel('Number of Medals')
-            plt.xticks(rotation=45, ha='right')
-            ax.legend(title='Medal Type')
-            st.pyplot(fig)
-            
     else:
         st.subheader("Selected Country/Year Analysis")
         
@@ -501,31 +487,37 @@ if user_menu == 'Medal Tally':
         st.dataframe(medal_tally_df)
         
         # Create medal type distribution chart
-        fig, ax = plt.subplots(figsize=(8, 6))
-        medals = medal_tally_df[['Gold', 'Silver', 'Bronze']].sum()
-        ax.pie(medals, labels=['Gold', 'Silver', 'Bronze'], 
-              colors=['gold', 'silver', 'peru'], autopct='%1.1f%%')
-        ax.set_title('Medal Type Distribution')
-        st.pyplot(fig)
+        def draw_medal_type_share():
+            fig, ax = plt.subplots(figsize=(8, 6))
+            medals = medal_tally_df[['Gold', 'Silver', 'Bronze']].sum()
+            ax.pie(medals, labels=['Gold', 'Silver', 'Bronze'], 
+                  colors=['gold', 'silver', 'peru'], autopct='%1.1f%%')
+            ax.set_title('Medal Type Distribution')
+            return fig
+        show_chart(draw_medal_type_share, selected_year, selected_country)
         
         # Show medal trend over time if year is not 'Overall'
         if selected_year != 'Overall':
-            country_df = yearwise_medal_tally(df, selected_country)
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.plot(country_df['Year'], country_df['Medal'])
-            ax.set_title(f'{selected_country} Medal Trend Over Time')
-            ax.set_xlabel('Year')
-            ax.set_ylabel('Number of Medals')
-            st.pyplot(fig)
+            def draw_medal_trend():
+                country_df = yearwise_medal_tally(df, selected_country)
+                fig, ax = plt.subplots(figsize=(12, 6))
+                ax.plot(country_df['Year'], country_df['Medal'])
+                ax.set_title(f'{selected_country} Medal Trend Over Time')
+                ax.set_xlabel('Year')
+                ax.set_ylabel('Number of Medals')
+                return fig
+            show_chart(draw_medal_trend, selected_country)
 
 elif user_menu == 'Overall Analysis':
     st.header("Overall Analysis")
-    editions = df['Year'].unique().shape[0]
-    cities = df['City'].unique().shape[0]
-    sports = df['Sport'].unique().shape[0]
-    events = df['Event'].unique().shape[0]
-    athletes = df['Name'].unique().shape[0]
-    nations = df['region'].unique().shape[0]
+    # Headline counts and the sport list come from one memoized pass
+    summary = overall_summary(df, distinct_error)
+    editions = summary['counts']['editions']
+    cities = summary['counts']['cities']
+    sports = summary['counts']['sports']
+    events = summary['counts']['events']
+    athletes = summary['counts']['athletes']
+    nations = summary['counts']['nations']
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -553,57 +545,70 @@ elif user_menu == 'Overall Analysis':
     st.subheader("Number of Events Over Time")
     
     # Get events over time data
-    events_over_time = data_over_time(df, 'Event')
+    events_over_time = data_over_time(df, 'Event', distinct_error)
+    
+    # Add summary statistics
+    st.markdown("### Summary Statistics")
+    st.write(f"**Total Number of Events:** {events_over_time['Count'].sum()}")
+    st.write(f"**Average Events per Edition:** {events_over_time['Count'].mean():.0f}")
+    st.write(f"**Maximum Events:** {events_over_time['Count'].max()} (in {events_over_time.loc[events_over_time['Count'].idxmax(), 'Edition']})")
     
     # Create visualization
-    fig, ax = plt.subplots(figsize=(15, 8))
+    def draw_events_over_time():
+        fig, ax = plt.subplots(figsize=(15, 8))
     
-    # Plot with markers and line
-    sns.lineplot(data=events_over_time, x='Edition', y='Count', marker='o', color='blue')
+        # Plot with markers and line
+        sns.lineplot(data=events_over_time, x='Edition', y='Count', marker='o', color='blue')
     
-    # Add grid for better readability
-    ax.grid(True, alpha=0.3)
+        # Add grid for better readability
+        ax.grid(True, alpha=0.3)
     
-    # Add title and labels with larger font
-    ax.set_title('Number of Events Over Time', pad=20, fontsize=16)
-    ax.set_xlabel('Olympic Edition', fontsize=14)
-    ax.set_ylabel('Number of Events', fontsize=14)
+        # Add title and labels with larger font
+        ax.set_title('Number of Events Over Time', pad=20, fontsize=16)
+        ax.set_xlabel('Olympic Edition', fontsize=14)
+        ax.set_ylabel('Number of Events', fontsize=14)
     
-    # Rotate x-axis labels for better visibility
-    plt.xticks(rotation=45, ha='right')
+        # Rotate x-axis labels for better visibility
+        plt.xticks(rotation=45, ha='right')
     
-    # Add data labels
-    for x, y in zip(events_over_time['Edition'], events_over_time['Count']):
-        ax.text(x, y, str(y), ha='center', va='bottom', fontsize=10)
+        # Add data labels
+        for x, y in zip(events_over_time['Edition'], events_over_time['Count']):
+            ax.text(x, y, str(y), ha='center', va='bottom', fontsize=10)
     
-    # Add trend line
-    z = np.polyfit(events_over_time['Edition'], events_over_time['Count'], 1)
-    p = np.poly1d(z)
-    ax.plot(events_over_time['Edition'], p(events_over_time['Edition']), "r--", label='Trend Line')
+        # Add trend line
+        z = np.polyfit(events_over_time['Edition'], events_over_time['Count'], 1)
+        p = np.poly1d(z)
+        ax.plot(events_over_time['Edition'], p(events_over_time['Edition']), "r--", label='Trend Line')
     
-    # Add legend
-    ax.legend(title='Trend')
+        # Add legend
+        ax.legend(title='Trend')
     
-    # Add summary statistics
-    st.markdown("### Summary Statistics")
-    st.write(f"**Total Number of Events:** {events_over_time['Count'].sum()}")
-    st.write(f"**Average Events per Edition:** {events_over_time['Count'].mean():.0f}")
-    st.write(f"**Maximum Events:** {events_over_time['Count'].max()} (in {events_over_time.loc[events_over_time['Count'].idxmax(), 'Edition']})")
+        return fig
+    show_chart(draw_events_over_time)
     
-    st.pyplot(fig)
+    nations_over_time = data_over_time(df, 'region', distinct_error)
+    fig = px.line(nations_over_time, x='Edition', y='Count')
+    st.subheader("Participating Nations over the years")
+    st.plotly_chart(fig)
+    
+    athlete_over_time = data_over_time(df, 'Name', distinct_error)
+    fig = px.line(athlete_over_time, x='Edition', y='Count')
+    st.subheader("Athletes over the years")
+    st.plotly_chart(fig)
     
     # Most Successful Athletes
     st.subheader("Most Successful Athletes")
     
     # Create sport selection filter
-    sport_list = df['Sport'].unique().tolist()
-    sport_list.sort()
-    sport_list.insert(0, 'Overall')
+    sport_list = ['Overall'] + summary['sports']
     selected_sport = st.selectbox('Select Sport', sport_list)
     
     # Get most successful athletes
     temp_df = most_successful(df, selected_sport)
     
+    # Keep numeric medal counts before the table column is decorated with emojis
+    athlete_medals = temp_df['Medals'].astype(int)
+    
     # Create tabs for different views
     tab1, tab2 = st.tabs(["Table View", "Visual Analysis"])
     
@@ -629,97 +634,63 @@ elif user_menu == 'Overall Analysis':
         # Add summary statistics
         st.markdown("### Summary Statistics")
         st.write(f"**Total Athletes:** {len(temp_df)}")
-        st.write(f"**Total Medals:** {temp_df['Medals'].str.extract(r'(\d+)')[0].astype(int).sum()}")
-        st.write(f"**Average Medals per Athlete:** {temp_df['Medals'].str.extract(r'(\d+)')[0].astype(int).mean():.1f}")
+        st.write(f"**Total Medals:** {athlete_medals.sum()}")
+        st.write(f"**Average Medals per Athlete:** {athlete_medals.mean():.1f}")
         
         # Add additional statistics
         st.markdown("### Additional Insights")
-        st.write(f"**Most Medals by a Single Athlete:** {temp_df['Medals'].str.extract(r'(\d+)')[0].astype(int).max()} 🏅")
-        st.write(f"**Most Successful Athlete:** {temp_df.loc[temp_df['Medals'].str.extract(r'(\d+)')[0].astype(int).idxmax(), 'Name']}")
+        st.write(f"**Most Medals by a Single Athlete:** {athlete_medals.max()} 🏅")
+        st.write(f"**Most Successful Athlete:** {temp_df.loc[athlete_medals.idxmax(), 'Name']}")
         st.write(f"**Most Successful Country:** {temp_df['region'].value_counts().idxmax()}")
     
     with tab2:
         st.markdown("### Athlete Success Analysis")
         
         # Create bar chart for medals
-        fig, ax = plt.subplots(figsize=(12, 6))
-        bars = ax.bar(temp_df['Name'], temp_df['Medals'].str.extract(r'(\d+)')[0].astype(int))
+        def draw_top_athletes():
+            fig, ax = plt.subplots(figsize=(12, 6))
+            bars = ax.bar(temp_df['Name'], athlete_medals)
         
-        # Add labels to bars
-        for bar in bars:
-            height = bar.get_height()
-            ax.annotate(f'{height} 🏅',
-                        xy=(bar.get_x() + bar.get_width() / 2, height),
-                        xytext=(0, 3),  # 3 points vertical offset
-                        textcoords="offset points",
-                        ha='center', va='bottom')
+            # Add labels to bars
+            for bar in bars:
+                height = bar.get_height()
+                ax.annotate(f'{height} 🏅',
+                            xy=(bar.get_x() + bar.get_width() / 2, height),
+                            xytext=(0, 3),  # 3 points vertical offset
+                            textcoords="offset points",
+                            ha='center', va='bottom')
         
-        # Add country flags as markers
-        for i, country in enumerate(temp_df['region']):
-            ax.text(i, -1, f'({country})', ha='center', fontsize=10)
+            # Add country flags as markers
+            for i, country in enumerate(temp_df['region']):
+                ax.text(i, -1, f'({country})', ha='center', fontsize=10)
         
-        ax.set_title(f'Top Athletes in {selected_sport if selected_sport != "Overall" else "All Sports"}')
-        ax.set_xlabel('Athlete Name')
-        ax.set_ylabel('Number of Medals')
-        plt.xticks(rotation=45, ha='right')
-        st.pyplot(fig)
+            ax.set_title(f'Top Athletes in {selected_sport if selected_sport != "Overall" else "All Sports"}')
+            ax.set_xlabel('Athlete Name')
+            ax.set_ylabel('Number of Medals')
+            plt.xticks(rotation=45, ha='right')
+            return fig
+        show_chart(draw_top_athletes, selected_sport)
         
         # Create pie chart for sport distribution
         if selected_sport == 'Overall':
-            sport_dist = temp_df['Sport'].value_counts()
-            fig, ax = plt.subplots(figsize=(8, 8))
-            ax.pie(sport_dist, labels=sport_dist.index, autopct='%1.1f%%')
-            ax.set_title('Sport Distribution of Top Athletes')
-            st.pyplot(fig)
+            def draw_top_athlete_sport_share():
+                sport_dist = temp_df['Sport'].value_counts()
+                fig, ax = plt.subplots(figsize=(8, 8))
+                ax.pie(sport_dist, labels=sport_dist.index, autopct='%1.1f%%')
+                ax.set_title('Sport Distribution of Top Athletes')
+                return fig
+            show_chart(draw_top_athlete_sport_share, selected_sport)
         
         # Create medal type distribution
         if selected_sport == 'Overall':
-            medal_types = df[df['Name'].isin(temp_df['Name'])]['Medal'].value_counts()
-            fig, ax = plt.subplots(figsize=(8, 8))
-            ax.pie(medal_types, labels=medal_types.index, 
-                  autopct='%1.1f%%', colors=['gold', 'silver', 'peru'])
-            ax.set_title('Medal Type Distribution')
-            st.pyplot(fig)
-    with col2:
-        st.header("Hosts")
-        st.title(cities)
-    with col3:
-        st.header("Sports")
-        st.title(sports)
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.header("Events")
-        st.title(events)
-    with col2:
-        st.header("Nations")
-        st.title(nations)
-    with col3:
-        st.header("Athletes")
-        st.title(athletes)
-    
-    nations_over_time = data_over_time(df, 'region')
-    fig = px.line(nations_over_time, x='Edition', y='region')
-    st.title("Participating Nations over the years")
-    st.plotly_chart(fig)
-    
-    events_over_time = data_over_time(df, 'Event')
-    fig = px.line(events_over_time, x='Edition', y='Event')
-    st.title("Events over the years")
-    st.plotly_chart(fig)
-    
-    athlete_over_time = data_over_time(df, 'Name')
-    fig = px.line(athlete_over_time, x='Edition', y='Name')
-    st.title("Athletes over the years")
-    st.plotly_chart(fig)
-    
-    st.title("Most Successful Athletes")
-    sport_list = df['Sport'].unique().tolist()
-    sport_list.sort()
-    sport_list.insert(0, 'Overall')
-    selected_sport = st.selectbox('Select Sport', sport_list)
-    temp_df = most_successful(df, selected_sport)
-    st.table(temp_df)
+            def draw_top_athlete_medal_share():
+                medal_types = athlete_rows(df, temp_df['Name'])['Medal'].value_counts()
+                fig, ax = plt.subplots(figsize=(8, 8))
+                ax.pie(medal_types, labels=medal_types.index, 
+                      autopct='%1.1f%%', colors=['gold', 'silver', 'peru'])
+                ax.set_title('Medal Type Distribution')
+                return fig
+            show_chart(draw_top_athlete_medal_share, selected_sport)
 
 elif user_menu == 'Country-wise Analysis':
     st.sidebar.title('Country-wise Analysis')
@@ -729,97 +700,132 @@ elif user_menu == 'Country-wise Analysis':
     
     # Medal tally over years
     st.header(f"{selected_country} Medal Tally Over the Years")
-    country_df = yearwise_medal_tally(df, selected_country)
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(country_df['Year'], country_df['Medal'])
-    ax.set_title(f'{selected_country} Medal Tally Over the Years')
-    ax.set_xlabel('Year')
-    ax.set_ylabel('Medals')
-    st.pyplot(fig)
+    def draw_country_medal_tally():
+        country_df = yearwise_medal_tally(df, selected_country)
+        fig, ax = plt.subplots(figsize=(12, 6))
+        ax.plot(country_df['Year'], country_df['Medal'])
+        ax.set_title(f'{selected_country} Medal Tally Over the Years')
+        ax.set_xlabel('Year')
+        ax.set_ylabel('Medals')
+        return fig
+    show_chart(draw_country_medal_tally, selected_country)
     
     # Sports performance heatmap
     st.header(f"{selected_country}'s Performance in Sports")
     pt = country_event_heatmap(df, selected_country)
-    fig, ax = plt.subplots(figsize=(15, 10))
-    sns.heatmap(pt, annot=True, cmap='viridis', ax=ax)
-    ax.set_title(f'{selected_country} Sports Performance')
-    st.pyplot(fig)
+    def draw_country_heatmap():
+        fig, ax = plt.subplots(figsize=(15, 10))
+        sns.heatmap(pt, annot=True, cmap='viridis', ax=ax)
+        ax.set_title(f'{selected_country} Sports Performance')
+        return fig
+    if pt.empty:
+        st.info(f"{selected_country} has not won an Olympic medal yet.")
+    else:
+        show_chart(draw_country_heatmap, selected_country)
+    
+    # Sports performance of several countries on shared sport and year axes
+    st.header("Compare Countries")
+    compared = st.multiselect('Countries to compare', country_list, default=[selected_country],
+                              max_selections=MAX_COMPARED_COUNTRIES, key='compared_countries')
+    comparison_mode = st.radio('Show', ['Side by side', 'Difference from the first'], horizontal=True,
+                               key='comparison_mode')
+    if compared:
+        heatmaps = country_comparison(df, tuple(compared))
+        baseline = heatmaps[compared[0]]
+        def draw_country_comparison():
+            if comparison_mode == 'Side by side':
+                shown = {country: heatmaps[country] for country in compared}
+                style = {'cmap': 'viridis', 'vmin': 0, 'vmax': max(pt.to_numpy().max() for pt in shown.values())}
+            else:
+                shown = {f'{country} - {compared[0]}': heatmaps[country] - baseline for country in compared[1:]}
+                style = {'cmap': 'RdBu', 'center': 0}
+            fig, axes = plt.subplots(1, len(shown), figsize=(8 * len(shown), 10), sharey=True, squeeze=False)
+            for ax, (title, pt) in zip(axes[0], shown.items()):
+                sns.heatmap(pt, annot=len(shown) == 1, ax=ax, **style)
+                ax.set_title(title)
+            return fig
+        if baseline.empty:
+            st.info("None of these countries has won an Olympic medal yet.")
+        elif comparison_mode != 'Side by side' and len(compared) < 2:
+            st.info("Select at least two countries to compare with the first.")
+        else:
+            show_chart(draw_country_comparison, tuple(compared), comparison_mode)
     
     # Top athletes
     st.header(f"Top 10 Athletes from {selected_country}")
     top10_df = most_successful_countrywise(df, selected_country)
     st.dataframe(top10_df)
     
-    # Age distribution analysis
-    athlete_df = df[df['region'] == selected_country]
-    athlete_age = athlete_df['Age'].dropna()
+    # Age distribution analysis from the precomputed histogram
+    age_histogram = country_profile(df, selected_country)['age_histogram']
+    mean_age = age_histogram['mean']
+    median_age = age_histogram['median']
     
     # Create histogram with more details
-    fig, ax = plt.subplots(figsize=(12, 6))
+    def draw_country_age():
+        fig, ax = plt.subplots(figsize=(12, 6))
     
-    # Plot histogram with density curve
-    sns.histplot(athlete_age, kde=True, ax=ax, bins=20)
+        # Plot histogram with the precomputed density curve, scaled to counts
+        edges = age_histogram['edges']
+        sns.histplot(x=(edges[:-1] + edges[1:]) / 2, weights=age_histogram['counts'], bins=edges, color='C0', ax=ax)
+        ax.plot(age_histogram['grid'], age_histogram['density'] * age_histogram['n'] * (edges[1] - edges[0]), color='C0')
     
-    # Add mean and median lines
-    mean_age = athlete_age.mean()
-    median_age = athlete_age.median()
-    ax.axvline(mean_age, color='red', linestyle='--', label=f'Mean: {mean_age:.1f}')
-    ax.axvline(median_age, color='blue', linestyle='--', label=f'Median: {median_age:.1f}')
+        # Add mean and median lines
+        ax.axvline(mean_age, color='red', linestyle='--', label=f'Mean: {mean_age:.1f}')
+        ax.axvline(median_age, color='blue', linestyle='--', label=f'Median: {median_age:.1f}')
     
-    # Add labels and title
-    ax.set_title(f'Athlete Age Distribution for {selected_country}', pad=20)
-    ax.set_xlabel('Age')
-    ax.set_ylabel('Number of Athletes')
+        # Add labels and title
+        ax.set_title(f'Athlete Age Distribution for {selected_country}', pad=20)
+        ax.set_xlabel('Age')
+        ax.set_ylabel('Number of Athletes')
     
-    # Add legend
-    ax.legend()
+        # Add legend
+        ax.legend()
     
-    # Add grid
-    ax.grid(True, alpha=0.3)
+        # Add grid
+        ax.grid(True, alpha=0.3)
     
-    # Show plot
-    st.pyplot(fig)
+        # Show plot
+        return fig
+    show_chart(draw_country_age, selected_country)
     
     # Display summary statistics
     st.write('**Age Statistics:**')
     st.write(f'Mean Age: {mean_age:.1f} years')
     st.write(f'Median Age: {median_age:.1f} years')
-    st.write(f'Standard Deviation: {athlete_age.std():.1f} years')
+    st.write(f"Standard Deviation: {age_histogram['std']:.1f} years")
 
 elif user_menu == 'Athlete-wise Analysis':
     st.header("Athlete-wise Analysis")
     
     # Age Analysis
     st.subheader("Age Analysis")
-    athlete_df = df.drop_duplicates(subset=['Name', 'region'])
     
-    # Age distribution by medal type
+    # Age distribution by medal type, from the precomputed density curves
     st.markdown("### Age Distribution by Medal Type")
-    x1 = athlete_df['Age'].dropna()
-    x2 = athlete_df[athlete_df['Medal'] == 'Gold']['Age'].dropna()
-    x3 = athlete_df[athlete_df['Medal'] == 'Silver']['Age'].dropna()
-    x4 = athlete_df[athlete_df['Medal'] == 'Bronze']['Age'].dropna()
-    
-    fig, ax = plt.subplots(figsize=(12, 6))
-    sns.kdeplot(x1, label='Overall', ax=ax)
-    sns.kdeplot(x2, label='Gold Medalists', ax=ax, color='gold')
-    sns.kdeplot(x3, label='Silver Medalists', ax=ax, color='silver')
-    sns.kdeplot(x4, label='Bronze Medalists', ax=ax, color='peru')
-    
-    ax.set_title('Age Distribution by Medal Type', pad=20)
-    ax.set_xlabel('Age')
-    ax.set_ylabel('Density')
-    ax.legend()
-    st.pyplot(fig)
+    age_segments = {
+        'Overall': age_distribution(df),
+        'Gold Medalists': age_distribution(df, 'Medal', 'Gold'),
+        'Silver Medalists': age_distribution(df, 'Medal', 'Silver'),
+        'Bronze Medalists': age_distribution(df, 'Medal', 'Bronze'),
+    }
+    segment_colors = {'Overall': None, 'Gold Medalists': 'gold', 'Silver Medalists': 'silver', 'Bronze Medalists': 'peru'}
+    
+    def draw_age_by_medal():
+        fig, ax = plt.subplots(figsize=(12, 6))
+        for label, distribution in age_segments.items():
+            ax.plot(distribution['grid'], distribution['density'], label=label, color=segment_colors[label])
+    
+        ax.set_title('Age Distribution by Medal Type', pad=20)
+        ax.set_xlabel('Age')
+        ax.set_ylabel('Density')
+        ax.legend()
+        return fig
+    show_chart(draw_age_by_medal)
     
     # Age distribution statistics
     st.markdown("### Age Statistics by Medal Type")
-    age_stats = pd.DataFrame({
-        'Overall': x1.describe(),
-        'Gold Medalists': x2.describe(),
-        'Silver Medalists': x3.describe(),
-        'Bronze Medalists': x4.describe()
-    }).T
+    age_stats = pd.DataFrame({label: age_summary(distribution) for label, distribution in age_segments.items()}).T
     st.dataframe(age_stats)
     
     # Height vs Weight Analysis
@@ -831,128 +837,157 @@ elif user_menu == 'Athlete-wise Analysis':
     sport_list.insert(0, 'Overall')
     selected_sport = st.selectbox('Select Sport', sport_list)
     
-    # Create athlete dataframe with necessary columns
-    athlete_df = df.drop_duplicates(subset=['Name', 'region'])
-    athlete_df = athlete_df[['Name', 'Sport', 'Sex', 'Height', 'Weight', 'Medal', 'region']]
-    
     if selected_sport != 'Overall':
-        # Filter by sport
-        temp_df = athlete_df[athlete_df['Sport'] == selected_sport]
+        # Athletes of the sport with precomputed bins and statistics
+        body = height_weight(df, selected_sport, scatter_max_points)
+        temp_df = body['athletes']
+        medal_palette = {'Gold': 'gold', 'Silver': 'silver', 'Bronze': 'peru', 'No Medal': 'lightgray'}
         
         # Create scatter plot with color-coded medals and gender
-        fig, ax = plt.subplots(figsize=(12, 8))
+        def draw_height_weight():
+            if body['points'] is None:
+                return draw_height_weight_bins()
+            fig, ax = plt.subplots(figsize=(12, 8))
+            points = body['points']
         
-        # Plot male athletes
-        male_df = temp_df[temp_df['Sex'] == 'M']
-        sns.scatterplot(data=male_df, x='Weight', y='Height', 
-                       hue='Medal', style='Medal', 
-                       palette={'Gold': 'gold', 'Silver': 'silver', 'Bronze': 'peru'},
-                       ax=ax, label='Male', s=100)
+            # Plot male athletes
+            male_df = points[points['Sex'] == 'M']
+            sns.scatterplot(data=male_df, x='Weight', y='Height', 
+                           hue='Medal', style='Medal', 
+                           palette=medal_palette,
+                           ax=ax, label='Male', s=100)
         
-        # Plot female athletes
-        female_df = temp_df[temp_df['Sex'] == 'F']
-        sns.scatterplot(data=female_df, x='Weight', y='Height', 
-                       hue='Medal', style='Medal', 
-                       palette={'Gold': 'gold', 'Silver': 'silver', 'Bronze': 'peru'},
-                       ax=ax, label='Female', marker='x', s=100)
+            # Plot female athletes
+            female_df = points[points['Sex'] == 'F']
+            sns.scatterplot(data=female_df, x='Weight', y='Height', 
+                           hue='Medal', style='Medal', 
+                           palette=medal_palette,
+                           ax=ax, label='Female', marker='x', s=100)
         
-        # Add grid for better readability
-        ax.grid(True, alpha=0.3)
+            # Add grid for better readability
+            ax.grid(True, alpha=0.3)
+        
+            # Add annotations for notable athletes (top medal winners)
+            annotate_notable(ax)
+        
+            # Add title and labels
+            ax.set_title(f'Height vs Weight for {selected_sport}', pad=20, fontsize=16)
+            ax.set_xlabel('Weight (kg)', fontsize=14)
+            ax.set_ylabel('Height (cm)', fontsize=14)
         
-        # Add annotations for notable athletes (top medal winners)
-        notable_athletes = temp_df[temp_df['Medal'] != 'No Medal'].head(5)
-        for _, athlete in notable_athletes.iterrows():
-            ax.text(athlete['Weight'], athlete['Height'], 
-                   athlete['Name'], fontsize=8, color='black', 
-                   bbox=dict(facecolor='white', alpha=0.7, edgecolor='black'))
+            # Improve legend
+            handles, labels = ax.get_legend_handles_labels()
+            new_labels = ['Male', 'Female'] + labels[2:]
+            ax.legend(handles[1:], new_labels, title='Category', fontsize=12)
+            return fig
         
-        # Add title and labels
-        ax.set_title(f'Height vs Weight for {selected_sport}', pad=20, fontsize=16)
-        ax.set_xlabel('Weight (kg)', fontsize=14)
-        ax.set_ylabel('Height (cm)', fontsize=14)
+        # Too many athletes to draw one by one: athletes per cell, per gender
+        def draw_height_weight_bins():
+            fig, axes = plt.subplots(1, 2, figsize=(16, 8), sharex=True, sharey=True)
+            bins = body['bins']
+            # Cell edges of the precomputed grid, shared by both panels
+            weight_edges = np.arange(bins['Weight'].min() - BODY_BIN_KG / 2, bins['Weight'].max() + BODY_BIN_KG, BODY_BIN_KG)
+            height_edges = np.arange(bins['Height'].min() - BODY_BIN_CM / 2, bins['Height'].max() + BODY_BIN_CM, BODY_BIN_CM)
+            for ax, (sex, label, cmap) in zip(axes, [('M', 'Male', 'Blues'), ('F', 'Female', 'Reds')]):
+                cells = bins[bins['Sex'] == sex]
+                # Empty cells stay blank
+                *_, mesh = ax.hist2d(cells['Weight'], cells['Height'], bins=[weight_edges, height_edges],
+                                     weights=cells['Count'], cmap=cmap, cmin=1)
+                fig.colorbar(mesh, ax=ax, label='Athletes')
+                annotate_notable(ax)
+                ax.set_title(label)
+                ax.set_xlabel('Weight (kg)', fontsize=14)
+                ax.grid(True, alpha=0.3)
+            axes[0].set_ylabel('Height (cm)', fontsize=14)
+            fig.suptitle(f'Height vs Weight for {selected_sport}', fontsize=16)
+            return fig
         
-        # Improve legend
-        handles, labels = ax.get_legend_handles_labels()
-        new_labels = ['Male', 'Female'] + labels[2:]
-        ax.legend(handles[1:], new_labels, title='Category', fontsize=12)
+        def annotate_notable(ax):
+            for athlete in body['notable'].itertuples():
+                if pd.notna(athlete.Weight) and pd.notna(athlete.Height):
+                    ax.text(athlete.Weight, athlete.Height, 
+                           athlete.Name, fontsize=8, color='black', 
+                           bbox=dict(facecolor='white', alpha=0.7, edgecolor='black'))
+        show_chart(draw_height_weight, selected_sport, scatter_max_points)
         
         # Add correlation analysis
-        corr = temp_df[['Height', 'Weight']].corr().iloc[0,1]
-        st.write(f'**Correlation between Height and Weight:** {corr:.2f}')
+        st.write(f"**Correlation between Height and Weight:** {body['corr']:.2f}")
         
         # Add statistical summary
         st.markdown("### Statistical Summary")
-        stats = temp_df[['Height', 'Weight']].describe()
-        st.dataframe(stats)
+        st.dataframe(body['summary'])
         
         # Add box plots for height and weight distribution
         st.markdown("### Distribution Analysis")
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+        def draw_height_weight_by_sex():
+            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
         
-        # Height distribution
-        sns.boxplot(data=temp_df, x='Sex', y='Height', ax=ax1)
-        ax1.set_title('Height Distribution by Gender', pad=15)
-        ax1.set_xlabel('Gender')
-        ax1.set_ylabel('Height (cm)')
+            # Height distribution
+            sns.boxplot(data=temp_df, x='Sex', y='Height', ax=ax1)
+            ax1.set_title('Height Distribution by Gender', pad=15)
+            ax1.set_xlabel('Gender')
+            ax1.set_ylabel('Height (cm)')
         
-        # Weight distribution
-        sns.boxplot(data=temp_df, x='Sex', y='Weight', ax=ax2)
-        ax2.set_title('Weight Distribution by Gender', pad=15)
-        ax2.set_xlabel('Gender')
-        ax2.set_ylabel('Weight (kg)')
+            # Weight distribution
+            sns.boxplot(data=temp_df, x='Sex', y='Weight', ax=ax2)
+            ax2.set_title('Weight Distribution by Gender', pad=15)
+            ax2.set_xlabel('Gender')
+            ax2.set_ylabel('Weight (kg)')
         
-        st.pyplot(fig)
-        
-        st.pyplot(fig)
+            return fig
+        show_chart(draw_height_weight_by_sex, selected_sport)
     else:
         st.write('Select a specific sport to view the analysis')
     
     # Gender Analysis
     st.subheader("Gender Analysis")
-    final = athlete_df.drop_duplicates(subset=['Name', 'region', 'Year'])
     
-    # Gender participation over years
+    # Gender participation over years, from the memoized participation counts
     st.markdown("### Gender Participation Over the Years")
-    final_men = final[final['Sex'] == 'M'].groupby('Year').count()['Name'].reset_index()
-    final_women = final[final['Sex'] == 'F'].groupby('Year').count()['Name'].reset_index()
-    final = final_men.merge(final_women, on='Year', how='left')
-    final.rename(columns={'Name_x': 'Male', 'Name_y': 'Female'}, inplace=True)
-    final.fillna(0, inplace=True)
-    
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.bar(final['Year'], final['Male'], label='Male', alpha=0.7)
-    ax.bar(final['Year'], final['Female'], bottom=final['Male'], label='Female', alpha=0.7)
-    
-    ax.set_title('Gender Participation Over the Years', pad=20)
-    ax.set_xlabel('Year')
-    ax.set_ylabel('Number of Athletes')
-    ax.legend()
-    st.pyplot(fig)
+    selected_season = st.radio('Season', ['Overall', 'Summer', 'Winter'], horizontal=True, key='gender_season')
+    if selected_season == 'Overall':
+        final = gender_participation(df)
+    else:
+        final = gender_participation(df, 'Season')
+        final = final[final['Season'] == selected_season]
+    
+    def draw_gender_participation():
+        fig, ax = plt.subplots(figsize=(12, 6))
+        ax.bar(final['Year'], final['Male'], label='Male', alpha=0.7)
+        ax.bar(final['Year'], final['Female'], bottom=final['Male'], label='Female', alpha=0.7)
+    
+        ax.set_title('Gender Participation Over the Years', pad=20)
+        ax.set_xlabel('Year')
+        ax.set_ylabel('Number of Athletes')
+        ax.legend()
+        return fig
+    show_chart(draw_gender_participation, selected_season)
     
     # Gender ratio analysis
     st.markdown("### Gender Ratio Analysis")
-    final['Total'] = final['Male'] + final['Female']
-    final['Female_Ratio'] = final['Female'] / final['Total'] * 100
     
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(final['Year'], final['Female_Ratio'], marker='o', color='purple')
-    ax.set_title('Female Participation Ratio Over the Years', pad=20)
-    ax.set_xlabel('Year')
-    ax.set_ylabel('Female Ratio (%)')
-    ax.grid(True, alpha=0.3)
-    st.pyplot(fig)
+    def draw_female_ratio():
+        fig, ax = plt.subplots(figsize=(12, 6))
+        ax.plot(final['Year'], final['Female_Ratio'], marker='o', color='purple')
+        ax.set_title('Female Participation Ratio Over the Years', pad=20)
+        ax.set_xlabel('Year')
+        ax.set_ylabel('Female Ratio (%)')
+        ax.grid(True, alpha=0.3)
+        return fig
+    show_chart(draw_female_ratio, selected_season)
     
     # Top Athletes Analysis
     st.subheader("Top Athletes Analysis")
-    top_athletes = most_successful(df, 'Overall')
+    leaders = top_athletes(df)
+    top_medals = leaders['medals']
     
     # Create a detailed view of top athletes
     st.markdown("### Top Athletes by Medal Type")
     
     # Split by medal type
-    gold_athletes = top_athletes[top_athletes['Medal'] == 'Gold']
-    silver_athletes = top_athletes[top_athletes['Medal'] == 'Silver']
-    bronze_athletes = top_athletes[top_athletes['Medal'] == 'Bronze']
+    gold_athletes = top_medals[top_medals['Medal'] == 'Gold']
+    silver_athletes = top_medals[top_medals['Medal'] == 'Silver']
+    bronze_athletes = top_medals[top_medals['Medal'] == 'Bronze']
     
     # Create tabs for different medal types
     tab1, tab2, tab3 = st.tabs(["Gold Medalists", "Silver Medalists", "Bronze Medalists"])
@@ -968,58 +1003,66 @@ elif user_menu == 'Athlete-wise Analysis':
     
     # Sport distribution of top athletes
     st.markdown("### Sport Distribution of Top Athletes")
-    fig, ax = plt.subplots(figsize=(12, 6))
-    sns.countplot(data=top_athletes, x='Sport', hue='Medal', 
-                 order=top_athletes['Sport'].value_counts().index,
-                 palette={'Gold': 'gold', 'Silver': 'silver', 'Bronze': 'peru'})
-    ax.set_title('Sport Distribution of Top Athletes', pad=20)
-    ax.set_xlabel('Sport')
-    ax.set_ylabel('Number of Athletes')
-    ax.legend(title='Medal Type')
-    st.pyplot(fig)
-    
-    # Age distribution of top athletes
+    def draw_top_athlete_sports():
+        fig, ax = plt.subplots(figsize=(12, 6))
+        sns.countplot(data=top_medals, x='Sport', hue='Medal', 
+                     order=top_medals['Sport'].value_counts().index,
+                     palette={'Gold': 'gold', 'Silver': 'silver', 'Bronze': 'peru'})
+        ax.set_title('Sport Distribution of Top Athletes', pad=20)
+        ax.set_xlabel('Sport')
+        ax.set_ylabel('Number of Medals')
+        ax.legend(title='Medal Type')
+        return fig
+    show_chart(draw_top_athlete_sports)
+    
+    # Age distribution of top athletes, from the precomputed density curve
     st.markdown("### Age Distribution of Top Athletes")
-    fig, ax = plt.subplots(figsize=(12, 6))
-    sns.kdeplot(top_athletes['Age'].dropna(), ax=ax)
-    ax.set_title('Age Distribution of Top Athletes', pad=20)
-    ax.set_xlabel('Age')
-    ax.set_ylabel('Density')
-    st.pyplot(fig)
+    def draw_top_athlete_age():
+        fig, ax = plt.subplots(figsize=(12, 6))
+        ax.plot(leaders['age_histogram']['grid'], leaders['age_histogram']['density'])
+        ax.set_title('Age Distribution of Top Athletes', pad=20)
+        ax.set_xlabel('Age')
+        ax.set_ylabel('Density')
+        return fig
+    show_chart(draw_top_athlete_age)
+    
+    # Athletes by total medals
+    top_athletes_df = leaders['athletes']
     
     # Create a bar chart for top athletes
-    fig, ax = plt.subplots(figsize=(12, 8))
-    # Sort athletes by total medals
-    top_athletes = top_athletes.sort_values('Total', ascending=False)
+    def draw_top_athlete_medals():
+        fig, ax = plt.subplots(figsize=(12, 8))
     
-    # Create stacked bars for each medal type
-    ax.bar(top_athletes['Name'], top_athletes['Gold'], label='Gold', color='gold')
-    ax.bar(top_athletes['Name'], top_athletes['Silver'], bottom=top_athletes['Gold'], label='Silver', color='silver')
-    ax.bar(top_athletes['Name'], top_athletes['Bronze'], 
-          bottom=top_athletes['Gold'] + top_athletes['Silver'], 
-          label='Bronze', color='peru')
+        # Create stacked bars for each medal type
+        ax.bar(top_athletes_df['Name'], top_athletes_df['Gold'], label='Gold', color='gold')
+        ax.bar(top_athletes_df['Name'], top_athletes_df['Silver'], bottom=top_athletes_df['Gold'], label='Silver', color='silver')
+        ax.bar(top_athletes_df['Name'], top_athletes_df['Bronze'], 
+              bottom=top_athletes_df['Gold'] + top_athletes_df['Silver'], 
+              label='Bronze', color='peru')
     
-    # Add labels and title
-    ax.set_title('Top 10 Most Successful Athletes', pad=20)
-    ax.set_xlabel('Athlete Name')
-    ax.set_ylabel('Number of Medals')
+        # Add labels and title
+        ax.set_title('Most Successful Athletes', pad=20)
+        ax.set_xlabel('Athlete Name')
+        ax.set_ylabel('Number of Medals')
     
-    # Rotate x-axis labels for better readability
-    plt.xticks(rotation=45, ha='right')
+        # Rotate x-axis labels for better readability
+        plt.xticks(rotation=45, ha='right')
     
-    # Add legend
-    ax.legend(title='Medal Type')
+        # Add legend
+        ax.legend(title='Medal Type')
     
-    # Add total medal count above each bar
-    for i, row in top_athletes.iterrows():
-        total = row['Total']
-        ax.text(i, total + 0.5, str(total), ha='center', va='bottom', fontweight='bold')
+        # Add total medal count above each bar
+        for i, total in enumerate(top_athletes_df['Total']):
+            ax.text(i, total + 0.5, str(total), ha='center', va='bottom', fontweight='bold')
     
-    # Add grid for better readability
-    ax.grid(True, axis='y', alpha=0.3)
+        # Add grid for better readability
+        ax.grid(True, axis='y', alpha=0.3)
     
-    # Show the plot
-    st.pyplot(fig)
+        # Show the plot
+        return fig
+    show_chart(draw_top_athlete_medals)
     
     # Also show the raw data
-    st.dataframe(top_athletes)
\ No newline at end of file
+    st.dataframe(top_athletes_df)
+
+profile.finish({'helpers': helper_cache, 'figures': figure_cache})
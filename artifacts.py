@@ -0,0 +1,169 @@
+import argparse
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from helper import (derived_table, install_derived, build_country_tables, build_country_profiles,
+                    build_country_profile, country_profile_tables, build_leaderboard, build_age_distributions,
+                    build_body_stats)
+
+ARTIFACT_DIR = os.path.join('.cache', 'artifacts')
+
+
+class ArtifactStore:
+    # Precomputed tables keyed by kind, one pickle per kind, each stamped with
+    # the fingerprint of the dataset it was computed from
+
+    def __init__(self, root=ARTIFACT_DIR):
+        self.root = root
+
+    def path(self, kind):
+        return os.path.join(self.root, f'{kind}.pkl')
+
+    def load(self, kind, fingerprint):
+        # The stored items, or None when missing or built from other data
+        try:
+            with open(self.path(kind), 'rb') as f:
+                artifact = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if fingerprint is None or artifact.get('fingerprint') != fingerprint:
+            return None
+        return artifact['items']
+
+    def save(self, kind, fingerprint, items):
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(kind)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'fingerprint': fingerprint, 'items': items}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+
+# Artifact kinds and the helper functions that build them from the dataset,
+# in dependency order
+BUILDERS = {
+    'country_tables': build_country_tables,
+    'leaderboard': build_leaderboard,
+    'country_profiles': build_country_profiles,
+    'age_distributions': build_age_distributions,
+    'body_stats': build_body_stats,
+}
+
+# Kinds holding one entry per key, e.g. per region, which warm builds in
+# parallel: the keys of a dataset, the function building one entry and the
+# function building the derived tables all entries are sliced from
+KEYED_BUILDERS = {
+    'country_profiles': (lambda df: sorted(df['region'].dropna().unique()), build_country_profile,
+                         country_profile_tables),
+}
+
+# Key batches per worker process, to even out regions of different sizes
+BATCHES_PER_WORKER = 4
+
+
+def load_artifacts(df, store=None, build_missing=True):
+    # Install every stored artifact matching the dataset into the helper
+    # cache, building and saving the missing or stale ones
+    store = store or ArtifactStore()
+    fingerprint = df.attrs.get('fingerprint')
+    for kind, build in BUILDERS.items():
+        items = store.load(kind, fingerprint)
+        if items is None:
+            if not build_missing:
+                continue
+            items = build(df)
+            if fingerprint is not None:
+                store.save(kind, fingerprint, items)
+        install_derived(df, kind, items)
+    return df
+
+
+def save_artifacts(df, store=None):
+    # Store the artifacts already built for the dataset, e.g. after appending rows
+    store = store or ArtifactStore()
+    for kind in BUILDERS:
+        items = derived_table(df, kind)
+        if items is not None:
+            store.save(kind, df.attrs['fingerprint'], items)
+
+
+# The dataset of a warm worker process, mapped once when the process starts
+_worker_df = None
+
+
+def _init_worker(path, fingerprint, shared):
+    from loader import map_artifact
+
+    # Every worker maps the same read-only artifact file, so the dataset is
+    # shared through the page cache instead of being pickled per task; the
+    # tables the keyed entries slice from arrive built once by the parent
+    global _worker_df
+    _worker_df = map_artifact(path)
+    _worker_df.attrs['fingerprint'] = fingerprint
+    for name, table in shared.items():
+        install_derived(_worker_df, name, table)
+
+
+def _build_kind(kind):
+    return BUILDERS[kind](_worker_df)
+
+
+def _build_entries(kind, keys):
+    build_entry = KEYED_BUILDERS[kind][1]
+    return {key: build_entry(_worker_df, key) for key in keys}
+
+
+def warm(df, path, workers=None, store=None):
+    # Build every artifact of the dataset mapped from path on a process pool
+    # and save them to the store. The tables keyed entries are sliced from
+    # are built once here and shipped to every worker, and kinds among them
+    # are saved as built; keyed kinds are split into batches of keys and the
+    # others are built whole by one worker each.
+    store = store or ArtifactStore()
+    fingerprint = df.attrs['fingerprint']
+    workers = workers or os.cpu_count() or 1
+    shared = {}
+    for _, _, build_shared in KEYED_BUILDERS.values():
+        shared.update(build_shared(df))
+    built = {}
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(path, fingerprint, shared)) as pool:
+        futures = {}
+        for kind in BUILDERS:
+            if kind in shared:
+                store.save(kind, fingerprint, shared[kind])
+                built[kind] = shared[kind]
+            elif kind in KEYED_BUILDERS:
+                keys = KEYED_BUILDERS[kind][0](df)
+                n_batches = max(min(len(keys), workers * BATCHES_PER_WORKER), 1)
+                batches = np.array_split(np.array(keys, dtype=object), n_batches)
+                futures[kind] = [pool.submit(_build_entries, kind, batch.tolist()) for batch in batches]
+            else:
+                futures[kind] = [pool.submit(_build_kind, kind)]
+
+        for kind, batches in futures.items():
+            if kind in KEYED_BUILDERS:
+                items = {}
+                for batch in batches:
+                    items.update(batch.result())
+            else:
+                items = batches[0].result()
+            store.save(kind, fingerprint, items)
+            built[kind] = items
+    return built
+
+
+if __name__ == '__main__':
+    from loader import artifact_path, load_dataset
+
+    parser = argparse.ArgumentParser(description='Precompute every artifact for the current dataset')
+    parser.add_argument('--workers', type=int, help='worker processes, one per core by default')
+    args = parser.parse_args()
+
+    # Offline build step, e.g. on the build host before deploying
+    dataset = load_dataset()
+    artifact_store = ArtifactStore()
+    for artifact_kind, artifact_items in warm(dataset, artifact_path(), args.workers, artifact_store).items():
+        print(f'Wrote {artifact_store.path(artifact_kind)} ({len(artifact_items)} entries)')
@@ -0,0 +1,260 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import helper
+
+# Size of the Kaggle "120 years of Olympic history" export, used as scale 1
+KAGGLE_ROWS = 271116
+KAGGLE_ATHLETES = 135571
+N_NOCS = 230
+N_REGIONS = 206
+N_SPORTS = 66
+N_EVENTS = 765
+MEDAL_SHARE = 0.147
+
+
+def _editions():
+    # Summer and Winter Games as (year, season), skipping the cancelled war years
+    summer = [y for y in range(1896, 2017, 4) if y not in (1916, 1940, 1944)] + [1906]
+    winter = [y for y in range(1924, 1993, 4) if y not in (1940, 1944)] + list(range(1994, 2015, 4))
+    return sorted([(y, 'Summer') for y in summer] + [(y, 'Winter') for y in winter])
+
+
+def make_synthetic(scale=1, seed=0):
+    # athlete_events / noc_regions shaped frames with roughly the Kaggle
+    # cardinalities; text columns are generated as categoricals so that the
+    # 100x dataset still fits in memory
+    rng = np.random.default_rng(seed)
+    n_rows = int(KAGGLE_ROWS * scale)
+    n_athletes = int(KAGGLE_ATHLETES * scale)
+
+    nocs = [f'N{i:03d}' for i in range(N_NOCS)]
+    regions = [f'Region {i % N_REGIONS}' for i in range(N_NOCS)]
+    regions[-3:] = [None] * 3
+    noc_df = pd.DataFrame({'NOC': nocs, 'region': regions, 'notes': None})
+
+    editions = _editions()
+    sports = [f'Sport {i}' for i in range(N_SPORTS)]
+    event_sport = np.sort(rng.integers(0, N_SPORTS, N_EVENTS))
+    events = [f'{sports[s]} Event {i}' for i, s in enumerate(event_sport)]
+
+    # Per-athlete attributes, so every row of one athlete agrees on them
+    athlete_sex = rng.choice(np.array([0, 1], dtype=np.int8), n_athletes, p=[0.27, 0.73])
+    athlete_noc = rng.zipf(1.6, n_athletes) % N_NOCS
+    athlete_sport = rng.integers(0, N_SPORTS, n_athletes)
+    athlete_birth = rng.integers(1870, 2000, n_athletes)
+
+    athlete = rng.integers(0, n_athletes, n_rows)
+    sport = athlete_sport[athlete]
+    edition = rng.integers(0, len(editions), n_rows)
+    edition_year = np.array([y for y, _ in editions], dtype=np.int64)
+    edition_season = np.array([s == 'Winter' for _, s in editions], dtype=np.int8)
+
+    # Pick an event belonging to the athlete's sport
+    sport_start = np.searchsorted(event_sport, np.arange(N_SPORTS))
+    sport_count = np.bincount(event_sport, minlength=N_SPORTS)
+    event = sport_start[sport] + (rng.integers(0, 1 << 30, n_rows) % np.maximum(sport_count[sport], 1))
+    event = np.minimum(event, N_EVENTS - 1)
+
+    medal = rng.choice(np.array([0, 1, 2, -1], dtype=np.int8), n_rows,
+                       p=[MEDAL_SHARE / 3] * 3 + [1 - MEDAL_SHARE])
+
+    def categorical(codes, categories):
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    year = edition_year[edition]
+    age = (year - athlete_birth[athlete]).clip(10, 70).astype(float)
+    age[rng.random(n_rows) < 0.035] = np.nan
+    height = rng.normal(175, 10, n_rows).round()
+    height[rng.random(n_rows) < 0.22] = np.nan
+    weight = rng.normal(70, 14, n_rows).round()
+    weight[rng.random(n_rows) < 0.23] = np.nan
+
+    games = [f'{y} {s}' for y, s in editions]
+    cities = [f'City {i}' for i in range(len(editions))]
+    athlete_df = pd.DataFrame({
+        'ID': athlete + 1,
+        'Name': categorical(athlete, [f'Athlete {i}' for i in range(n_athletes)]),
+        'Sex': categorical(athlete_sex[athlete], ['F', 'M']),
+        'Age': age,
+        'Height': height,
+        'Weight': weight,
+        'Team': categorical(athlete_noc[athlete], [f'{noc} Team' for noc in nocs]),
+        'NOC': categorical(athlete_noc[athlete], nocs),
+        'Games': categorical(edition, games),
+        'Year': year,
+        'Season': categorical(edition_season[edition], ['Summer', 'Winter']),
+        'City': categorical(edition, cities),
+        'Sport': categorical(sport, sports),
+        'Event': categorical(event, events),
+        'Medal': categorical(medal, ['Gold', 'Silver', 'Bronze']),
+    })
+    return athlete_df, noc_df
+
+
+def bench_cases(df):
+    # Representative arguments for every helper: a large and a mid-sized
+    # region, the largest sport and the latest edition
+    region_sizes = df['region'].value_counts()
+    big_region = str(region_sizes.index[0])
+    mid_region = str(region_sizes.index[len(region_sizes) // 2])
+    big_sport = str(df['Sport'].value_counts().index[0])
+    year = int(df['Year'].max())
+    return [
+        ('medal_tally', ()),
+        ('country_year_list', ()),
+        ('fetch_medal_tally', ('Overall', 'Overall')),
+        ('fetch_medal_tally', ('Overall', big_region)),
+        ('fetch_medal_tally', (year, 'Overall')),
+        ('fetch_medal_tally', (year, big_region)),
+        ('overall_summary', ()),
+        ('data_over_time', ('Event',)),
+        ('data_over_time', ('region',)),
+        ('data_over_time', ('Name',)),
+        ('data_over_time', ('Name', 0.01)),
+        ('most_successful', ('Overall',)),
+        ('most_successful', (big_sport,)),
+        ('yearwise_medal_tally', (big_region,)),
+        ('yearwise_medal_tally', (mid_region,)),
+        ('country_event_heatmap', (big_region,)),
+        ('country_event_heatmap', (mid_region,)),
+        ('country_comparison', ((big_region, mid_region),)),
+        ('most_successful_countrywise', (big_region,)),
+        ('most_successful_countrywise', (mid_region,)),
+        ('gender_participation', ()),
+        ('gender_participation', ('Sport',)),
+        ('height_weight', (big_sport,)),
+        ('height_weight', (big_sport, 2000)),
+        ('age_distribution', ()),
+        ('age_distribution', ('Medal', 'Gold')),
+        ('top_athletes', ()),
+    ]
+
+
+def _time_call(func, df, args, repeat, cold):
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            helper.clear_derived(df)
+        start = time.perf_counter()
+        func(df, *args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _peak_memory(func, df, args, cold):
+    if cold:
+        helper.clear_derived(df)
+    tracemalloc.start()
+    try:
+        func(df, *args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(scales=(1,), repeat=5, functions=None, seed=0, log=sys.stderr):
+    results = []
+    for scale in scales:
+        athlete_df, noc_df = make_synthetic(scale, seed)
+
+        start = time.perf_counter()
+        df = helper.preprocess_data(athlete_df, noc_df)
+        preprocess_s = time.perf_counter() - start
+        del athlete_df
+        results.append({
+            'function': 'preprocess_data', 'args': [], 'scale': scale, 'rows': len(df), 'mode': 'cold',
+            'min_s': preprocess_s, 'median_s': preprocess_s, 'peak_mb': None,
+        })
+        print(f'scale {scale}: {len(df):,} rows, preprocess {preprocess_s:.2f}s', file=log)
+
+        for name, args in bench_cases(df):
+            if functions and name not in functions:
+                continue
+            func = getattr(helper, name)
+            # Cold calls rebuild the derived tables first; warm calls reuse them
+            for mode in ('cold', 'warm'):
+                timings = _time_call(func, df, args, repeat, cold=mode == 'cold')
+                peak = _peak_memory(func, df, args, cold=mode == 'cold')
+                results.append({
+                    'function': name, 'args': [str(a) for a in args], 'scale': scale, 'rows': len(df),
+                    'mode': mode, 'min_s': min(timings), 'median_s': statistics.median(timings),
+                    'peak_mb': peak / 2 ** 20,
+                })
+                print(f'  {name}{tuple(args)} [{mode}] median {statistics.median(timings) * 1000:.1f} ms, '
+                      f'peak {peak / 2 ** 20:.1f} MB', file=log)
+        del df
+        helper.clear_derived()
+    return results
+
+
+def _result_key(result):
+    return result['function'], tuple(result['args']), result['scale'], result['mode']
+
+
+def compare(results, baseline, threshold):
+    # Print median-time ratios against a previous run and count the cases
+    # slower than threshold x; runs must share the seed for the arguments to match
+    previous = {_result_key(result): result for result in baseline['results']}
+    regressions = 0
+    for result in results:
+        old = previous.get(_result_key(result))
+        if old is None:
+            continue
+        ratio = result['median_s'] / old['median_s'] if old['median_s'] else float('inf')
+        flag = ''
+        if ratio > threshold:
+            regressions += 1
+            flag = '  REGRESSION'
+        print(f"{result['function']}{tuple(result['args'])} x{result['scale']} [{result['mode']}]: "
+              f"{old['median_s'] * 1000:.1f} -> {result['median_s'] * 1000:.1f} ms ({ratio:.2f}x){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark helper.py over synthetic Olympic datasets')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100],
+                        help='dataset sizes as multiples of the Kaggle export')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--functions', nargs='+', help='only benchmark these helper functions')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='median-time ratio above which a case counts as a regression')
+    args = parser.parse_args(argv)
+
+    scales = [int(s) if float(s).is_integer() else s for s in args.scales]
+    results = run(scales, args.repeat, args.functions, args.seed)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 1 if compare(results, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
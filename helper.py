@@ -1,48 +1,575 @@
+import threading
+import weakref
+
 import pandas as pd
 import numpy as np
 
+from singleflight import SingleFlight
+from sketch import hll_precision, hll_registers, hll_estimate
+
+MEDAL_TYPES = ['Gold', 'Silver', 'Bronze']
+
+# Compact schema of the merged frame: repeated strings are stored once as
+# categoricals, numerics are narrowed and athletes are keyed by the integer ID
+MEDAL_DTYPE = pd.CategoricalDtype(MEDAL_TYPES + ['No Medal'])
+CATEGORY_COLUMNS = ['Name', 'Sex', 'Team', 'NOC', 'Games', 'Season', 'City', 'Sport', 'Event', 'region', 'notes']
+NUMERIC_DTYPES = {'ID': 'int32', 'Year': 'int16', 'Age': 'float32', 'Height': 'float32', 'Weight': 'float32'}
+
+# Columns identifying a single medal award
+MEDAL_EVENT_KEY = ['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal']
+
+# Tables derived from a preprocessed frame, built on first use and kept for as
+# long as that frame is alive so repeated calls only slice them. Sessions that
+# ask for a table while another is building it wait for that build.
+_derived_tables = {}
+_tables_lock = threading.Lock()
+_builds = SingleFlight()
+
+def _tables(df):
+    tables = _derived_tables.get(id(df))
+    if tables is None:
+        # Sessions making their first call at once share one dict and one
+        # finalizer, so no build is stored into a dict that gets replaced
+        with _tables_lock:
+            tables = _derived_tables.get(id(df))
+            if tables is None:
+                tables = _derived_tables[id(df)] = {}
+                weakref.finalize(df, _derived_tables.pop, id(df), None)
+    return tables
+
+def _store(entries, key, build, *args):
+    # Skips the build when one finished since the caller looked
+    if key not in entries:
+        entries[key] = build(*args)
+    return entries[key]
+
+def _derived(df, name, build):
+    tables = _tables(df)
+    if name not in tables:
+        return _builds.do((id(df), name), _store, tables, name, build, df)
+    return tables[name]
+
+def _derived_entry(df, name, key, build, build_table=lambda df: {}):
+    # One entry of a derived table of entries, e.g. per region, built by
+    # build(df, key) on first use
+    entries = _derived(df, name, build_table)
+    if key not in entries:
+        return _builds.do((id(df), name, key), _store, entries, key, build, df, key)
+    return entries[key]
+
+def derived_table(df, name):
+    # A derived table if it was built already, else None
+    return _tables(df).get(name)
+
+def install_derived(df, name, table):
+    # Register a table computed elsewhere, e.g. loaded from the artifact store
+    _tables(df)[name] = table
+
+def clear_derived(df=None):
+    # Drop the derived tables of one frame, or of every frame
+    if df is None:
+        _derived_tables.clear()
+    else:
+        _derived_tables.pop(id(df), None)
+
+def _build_medal_events(df):
+    # One row per medal won, so a team medal counts once per team rather than
+    # once per athlete; the index keeps the row label of the first athlete row
+    medal_df = df.loc[df['Medal'].isin(MEDAL_TYPES), MEDAL_EVENT_KEY + ['region']]
+    medal_df = medal_df.drop_duplicates(subset=MEDAL_EVENT_KEY)
+    medal_df.index.name = 'row_id'
+    return medal_df
+
+def medal_events(df):
+    return _derived(df, 'medal_events', _build_medal_events)
+
+def _object_levels(series):
+    # Plain string labels, so tables of different frames align on them
+    index = series.index
+    levels = [index.get_level_values(level) for level in range(index.nlevels)]
+    levels = [values.astype(object) if isinstance(values.dtype, pd.CategoricalDtype) else values for values in levels]
+    series.index = pd.MultiIndex.from_arrays(levels, names=index.names)
+    return series.sort_index()
+
+def _medal_counts(medal_df):
+    # Region x Year x medal type counts of medal events, in long form
+    return _object_levels(medal_df.groupby(['region', 'Year', 'Medal'], observed=True).size())
+
+def _cube_from_counts(counts):
+    cube = counts.unstack('Medal', fill_value=0)
+    return cube.reindex(columns=pd.Index(MEDAL_TYPES), fill_value=0).astype(int).sort_index()
+
+def _build_medal_cube(df):
+    # Region x Year x medal type counts over the medal events
+    return _cube_from_counts(_medal_counts(medal_events(df)))
+
+def _build_medal_cube_by_year(df):
+    # Same cube with Year as the outer level, for single-edition lookups
+    return _derived(df, 'medal_cube', _build_medal_cube).swaplevel().sort_index()
+
+def _build_region_medal_totals(df):
+    return _derived(df, 'medal_cube', _build_medal_cube).groupby(level='region').sum()
+
+def _cube_slice(cube, key):
+    # Rows of one outer-level key as a new frame indexed by the inner level
+    if key not in cube.index.levels[0]:
+        return cube.iloc[:0].droplevel(0)
+    return cube.xs(key, level=0)
+
+class GroupIndex:
+    # Start/stop offsets of every category of one column. The rows of a value
+    # are order[start:stop], or simply start:stop when the frame is already
+    # sorted by the column, so filtering costs O(rows returned), not O(N).
+    
+    def __init__(self, column):
+        self.categories = column.cat.categories
+        codes = column.cat.codes.to_numpy()
+        
+        # Missing values (code -1) are kept out of every group
+        valid = codes >= 0
+        counts = np.bincount(codes[valid], minlength=len(self.categories))
+        self.stops = np.cumsum(counts)
+        self.starts = self.stops - counts
+        
+        n_valid = int(valid.sum())
+        if valid[:n_valid].all() and (np.diff(codes[:n_valid]) >= 0).all():
+            self.order = None
+        else:
+            self.order = np.argsort(np.where(valid, codes, len(self.categories)), kind='stable')
+    
+    def positions(self, key):
+        code = self.categories.get_indexer([key])[0]
+        if code < 0:
+            return slice(0, 0)
+        start, stop = self.starts[code], self.stops[code]
+        return slice(start, stop) if self.order is None else self.order[start:stop]
+    
+    def rows(self, df, key):
+        return df.iloc[self.positions(key)]
+    
+    def positions_of(self, keys):
+        # Rows of any of keys in frame order, as an isin mask selects them
+        codes = self.categories.get_indexer(pd.unique(pd.Series(keys, dtype=object)))
+        ranges = [np.arange(self.starts[code], self.stops[code]) for code in codes[codes >= 0]]
+        positions = np.concatenate(ranges) if ranges else np.array([], dtype=np.int64)
+        return np.sort(positions if self.order is None else self.order[positions])
+
+def _build_name_index(df):
+    return GroupIndex(df['Name'])
+
+def _build_id_index(df):
+    return GroupIndex(df['ID'].astype('category'))
+
+def athlete_rows(df, names):
+    # Rows of the athletes of the given names, without scanning every name
+    return df.iloc[_derived(df, 'name_index', _build_name_index).positions_of(names)]
+
+def warm_derived(df):
+    # Build every derived table up front, e.g. right after loading
+    medal_events(df)
+    _derived(df, 'medal_cube', _build_medal_cube)
+    _derived(df, 'medal_cube_by_year', _build_medal_cube_by_year)
+    _derived(df, 'region_medal_totals', _build_region_medal_totals)
+    _derived(df, 'country_tables', build_country_tables)
+    _derived(df, 'medal_tensor', build_medal_tensor)
+    _derived(df, 'country_profiles', build_country_profiles)
+    overall_summary(df)
+    return df
+
 def preprocess_data(athlete_df, noc_df):
     # Merge datasets
     df = athlete_df.merge(noc_df, on='NOC', how='left')
     
     # Clean medal data
-    df['Medal'].fillna('No Medal', inplace=True)
+    df['Medal'] = df['Medal'].astype(MEDAL_DTYPE).fillna('No Medal')
     
     # Convert types
     df['Age'] = pd.to_numeric(df['Age'], errors='coerce')
     df['Height'] = pd.to_numeric(df['Height'], errors='coerce')
     df['Weight'] = pd.to_numeric(df['Weight'], errors='coerce')
     
+    # Interned athlete key; the Kaggle export ships one, otherwise number the names
+    if 'ID' not in df.columns:
+        df['ID'] = pd.factorize(df['Name'])[0] + 1
+    
+    # Apply the compact schema
+    df = df.astype({col: 'category' for col in CATEGORY_COLUMNS if col in df.columns})
+    df = df.astype(NUMERIC_DTYPES)
+    
     return df
 
-def medal_tally(df):
-    # Create a copy of the dataframe
-    medal_df = df.copy()
+def _align_categories(frame, like):
+    # Recode the categorical columns of frame to the categories of like
+    frame = frame.copy()
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].cat.set_categories(like[col].cat.categories)
+    return frame
+
+def _concat_rows(df, batch):
+    # Append the rows of batch; new category values are added after the
+    # existing ones so the codes of the old rows stay valid
+    df, batch = df.copy(), batch.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            categories = df[col].cat.categories
+            added = batch[col].cat.categories.difference(categories)
+            df[col] = df[col].cat.add_categories(added)
+            batch[col] = batch[col].cat.set_categories(df[col].cat.categories)
+    return pd.concat([df, batch[df.columns]], ignore_index=True)
+
+def _extend_medal_events(events, df, batch, combined):
+    # Medal events never span editions, so those of batch are only appended
+    added = medal_events(batch).copy()
+    added.index = added.index + len(df)
+    added.index.name = 'row_id'
+    return pd.concat([_align_categories(events, combined), _align_categories(added, combined)])
+
+def _extend_medal_cube(cube, df, batch, combined):
+    # Summer and Winter Games before 1994 share a year, so cells are added
+    cube = cube.add(_build_medal_cube(batch), fill_value=0).astype(int)
+    return cube.sort_index()
+
+def _extend_country_profiles(profiles, df, batch, combined):
+    # Profiles of the regions present in batch are rebuilt on next use
+    changed = set(batch['region'].dropna().unique())
+    return {region: profile for region, profile in profiles.items() if region not in changed}
+
+def _extend_overall_summary(summaries, df, batch, combined):
+    # New editions add year rows, and as old category codes stay valid the
+    # categories seen by the old and the appended rows OR together; sketched
+    # per-year counts are estimated from the merged year sketches. A summary
+    # is rebuilt when an appended edition shares a year with a loaded one.
+    added = combined.iloc[len(df):]
+    part = _build_overall_summary(added)
+    extended = {}
+    for precision, summary in summaries.items():
+        years = np.union1d(summary['years'], part['years'])
+        if len(years) < len(summary['years']) + len(part['years']):
+            continue
+        merged = {'years': years, 'per_year': {}, 'observed': {}, 'missing': {}, 'sketched': summary['sketched']}
+        for col in OVERALL_COLUMNS.values():
+            observed = part['observed'][col].copy()
+            observed[:len(summary['observed'][col])] |= summary['observed'][col]
+            merged['observed'][col] = observed
+            merged['missing'][col] = summary['missing'][col] or part['missing'][col]
+            if col in summary['sketched']:
+                merged['per_year'][col] = _estimated_counts(_year_sketch(combined, col, precision)[1])
+            else:
+                per_year = np.zeros(len(years), dtype=np.int64)
+                per_year[np.searchsorted(years, summary['years'])] = summary['per_year'][col]
+                per_year[np.searchsorted(years, part['years'])] = part['per_year'][col]
+                merged['per_year'][col] = per_year
+        extended[precision] = _summary_counts(combined, merged)
+    return extended
+
+def _extend_participation(tables, df, batch, combined):
+    # Athletes are counted per year, so the rows of new editions are appended
+    # to every breakdown; one sharing a year with a loaded edition is rebuilt
+    added = combined.iloc[len(df):]
+    extended = {}
+    for by, frame in tables.items():
+        part = _participation(added, by)
+        if np.isin(part['Year'].unique(), frame['Year'].unique()).any():
+            continue
+        extended[by] = pd.concat([frame, part], ignore_index=True).sort_values('Year', kind='stable', ignore_index=True)
+    return extended
+
+def _extend_leaderboard(leaderboard, df, batch, combined):
+    # The medals of the appended rows add to every medalist's count and the
+    # leaders are selected again from the sums
+    part = build_leaderboard(combined.iloc[len(df):])
+    medals = leaderboard['medals'].add(part['medals'], fill_value=0).astype(np.int64)
+    sport_medals = leaderboard['sport_medals'].add(part['sport_medals'], fill_value=0).astype(np.int64)
+    athlete_info = pd.concat([leaderboard['athlete_info'], part['athlete_info']]).reset_index().drop_duplicates()
+    return _leaderboard(medals, sport_medals.sort_index(), athlete_info.set_index('ID').sort_index(kind='stable'))
+
+def _in_order(frame, labels):
+    # The rows of frame in the order of labels, keeping the index name
+    return frame.iloc[np.argsort(labels.get_indexer(frame.index), kind='stable')]
+
+def _extend_body_stats(body, df, batch, combined):
+    # An athlete is the first row of a name and region, so the appended rows
+    # only add athletes not seen before. Their cells and sums add to the old
+    # ones; the summary statistics of the sports they join are recomputed.
+    n_regions = len(combined['region'].cat.categories) + 1
+    def athlete_keys(frame):
+        return frame['Name'].cat.codes.to_numpy().astype(np.int64) * n_regions + frame['region'].cat.codes.to_numpy() + 1
+    added = combined.iloc[len(df):].drop_duplicates(subset=['Name', 'region'])
+    part = build_body_stats(added[~np.isin(athlete_keys(added), athlete_keys(body['athletes']))])
+    
+    athletes = pd.concat([_align_categories(body['athletes'], combined), part['athletes']], ignore_index=True)
+    # Sports in category order, as a fresh build lists them
+    sports = combined['Sport'].cat.categories.astype(str)
+    sums = _in_order(body['sums'].add(part['sums'], fill_value=0), sports)
+    changed = list(part['athletes']['Sport'].dropna().unique())
+    summary = athletes[athletes['Sport'].isin(changed)].groupby('Sport', observed=True)[['Height', 'Weight']].describe()
+    summary = pd.concat([body['summary'].drop(index=changed, errors='ignore'), summary.rename(index=str)])
+    return {
+        'athletes': athletes,
+        'sport_index': GroupIndex(athletes['Sport']),
+        'bins': body['bins'].add(part['bins'], fill_value=0).astype(np.int64).sort_index(),
+        'summary': _in_order(summary, sports),
+        'sums': sums,
+        'corr': _body_corr(sums),
+    }
+
+def _extend_year_sketches(sketches, df, batch, combined):
+    # Sketches merge, so only the appended rows are hashed, by their codes in
+    # the combined categories
+    added = combined.iloc[len(df):]
+    return {
+        (col, precision): _merge_year_sketches(sketch, _build_year_sketch(added, col, precision))
+        for (col, precision), sketch in sketches.items()
+    }
+
+# How each derived table is carried over to a frame with appended rows, in
+# dependency order; tables not listed are rebuilt from scratch on next use,
+# like the age distributions and top athletes, or derived again from an
+# extended table, like the region leaderboard and the medal tensor
+_EXTENDERS = {
+    'medal_events': _extend_medal_events,
+    'medal_cube': _extend_medal_cube,
+    'medal_cube_by_year': lambda cube, df, batch, combined: _build_medal_cube_by_year(combined),
+    'region_medal_totals': lambda totals, df, batch, combined: _build_region_medal_totals(combined),
+    'country_tables': lambda tables, df, batch, combined: _merge_country_tables(tables, build_country_tables(batch)),
+    'country_profiles': _extend_country_profiles,
+    'year_sketches': _extend_year_sketches,
+    'overall_summary': _extend_overall_summary,
+    'participation': _extend_participation,
+    'leaderboard': _extend_leaderboard,
+    'body_stats': _extend_body_stats,
+}
+
+def _batch_ids(df, names):
+    # IDs for appended rows without an ID column, numbered as preprocess_data
+    # numbers a whole dataset: a name already loaded keeps its ID and new
+    # names continue after the largest ID
+    known = df[['Name', 'ID']].drop_duplicates('Name')
+    ids = pd.Series(known['ID'].to_numpy(), index=known['Name'].astype(object))
+    new = pd.unique(names[~names.isin(ids.index)].dropna())
+    ids = pd.concat([ids, pd.Series(np.arange(1, len(new) + 1) + int(df['ID'].max()), index=new)])
+    return names.map(ids).fillna(0).astype(np.int64)
+
+def append_rows(df, athlete_batch, noc_df):
+    # Preprocess raw athlete_events rows of new Games editions and append
+    # them to df. The derived tables of df are updated from the new rows
+    # alone and installed on the returned frame.
+    if 'ID' not in athlete_batch.columns:
+        athlete_batch = athlete_batch.assign(ID=_batch_ids(df, athlete_batch['Name']))
+    batch = preprocess_data(athlete_batch, noc_df)
+    loaded = set(batch['Games'].unique()) & set(df['Games'].unique())
+    if loaded:
+        raise ValueError(f"Games already loaded: {', '.join(sorted(map(str, loaded)))}")
+    
+    combined = _concat_rows(df, batch)
+    tables = _tables(df)
+    for name, extend in _EXTENDERS.items():
+        if name in tables:
+            install_derived(combined, name, extend(tables[name], df, batch, combined))
+    clear_derived(batch)
+    return combined
+
+# Columns data_over_time can count in chunked mode
+OVER_TIME_COLUMNS = ['Event', 'region', 'Name']
+
+def _add_counts(total, counts):
+    return counts if total is None else total.add(counts, fill_value=0).astype(np.int64)
+
+def _hashes(values):
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+def _fold(parts, part, combine):
+    # Keep parts of decreasing size, merging the newest into the one before it
+    # while it is as large, so every row is merged O(log chunks) times rather
+    # than once per chunk and there are O(log chunks) parts to search
+    parts.append(part)
+    while len(parts) > 1 and len(parts[-1]) >= len(parts[-2]):
+        parts[-2:] = [combine(parts[-2:])]
+
+def _sum_counts(parts):
+    return pd.concat(parts).groupby(level=list(range(parts[0].index.nlevels))).sum()
+
+def _unique_rows(parts):
+    return pd.concat(parts).drop_duplicates()
+
+def _unique_hashes(parts):
+    return np.unique(np.concatenate(parts))
+
+def _seen_hashes(parts, hashes):
+    # Which hashes are in any of the sorted parts, by binary search rather
+    # than re-sorting the parts as np.isin does
+    seen = np.zeros(len(hashes), dtype=bool)
+    for part in filter(len, parts):
+        positions = np.minimum(np.searchsorted(part, hashes), len(part) - 1)
+        seen |= part[positions] == hashes
+    return seen
+
+def _year_registers(year_codes, n_years, column, precision, by_value=False):
+    # One HyperLogLog sketch per year of the values of column; missing values
+    # are not counted. Categories are hashed by code unless by_value, which
+    # is much cheaper than hashing strings but only merges with sketches of
+    # frames sharing the categories, as a frame with appended rows does.
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.cat.codes.to_numpy()
+        valid = codes >= 0
+        categories = column.cat.categories
+        if by_value:
+            hashes = pd.util.hash_array(categories.to_numpy(), categorize=False)
+        else:
+            hashes = pd.util.hash_array(np.arange(len(categories), dtype=np.int64))
+        return hll_registers(year_codes[valid], n_years, hashes, precision, codes[valid])
+    valid = column.notna().to_numpy()
+    return hll_registers(year_codes[valid], n_years, _hashes(column[valid]), precision)
+
+def _build_year_sketch(df, col, precision, by_value=False):
+    year_codes, years = pd.factorize(df['Year'], sort=True)
+    return np.asarray(years), _year_registers(year_codes, len(years), df[col], precision, by_value)
+
+def _merge_year_sketches(left, right):
+    # Union of two (years, registers) sketches, e.g. of two chunks or of the
+    # history and a new edition
+    years = np.union1d(left[0], right[0])
+    registers = np.zeros((len(years), left[1].shape[1]), dtype=np.uint8)
+    for part_years, part in (left, right):
+        rows = np.searchsorted(years, part_years)
+        registers[rows] = np.maximum(registers[rows], part)
+    return years, registers
+
+def _estimated_counts(registers):
+    return np.rint(hll_estimate(registers)).astype(np.int64)
+
+def _year_sketch(df, col, precision):
+    return _derived_entry(df, 'year_sketches', (col, precision), lambda df, key: _build_year_sketch(df, *key))
+
+def year_sketch(df, col, error):
+    # Per-year sketch of col whose estimates have at most the given relative
+    # standard error, kept per column and precision
+    return _year_sketch(df, col, hll_precision(error))
+
+class ChunkedSummary:
+    # Medal tallies, over-time counts and per-athlete counters folded in one
+    # preprocessed chunk at a time, for archives too large to load whole.
+    # No rows are kept: besides the counts, only 64-bit hashes of the medal
+    # event keys and of the distinct values per year, to deduplicate across
+    # chunks. Athletes are keyed by ID, which must be unique across chunks.
+    # With an error bound, distinct values per year are kept as fixed-size
+    # HyperLogLog sketches instead of hashes and data_over_time estimates.
+    
+    def __init__(self, error=None):
+        self.precision = None if error is None else hll_precision(error)
+        self.rows = 0
+        self.regions = set()
+        self.years = set()
+        self._medal_counts = None
+        self._medal_keys = []
+        self._distinct = {col: {} for col in OVER_TIME_COLUMNS}
+        self._sketches = {}
+        self._athlete_counts = []
+        self._athlete_info = []
+    
+    def add(self, chunk):
+        self.rows += len(chunk)
+        self.regions.update(chunk['region'].dropna().unique())
+        self.years.update(chunk['Year'].unique().tolist())
+        
+        # Medal events, a team medal may span chunks
+        medal_df = chunk.loc[chunk['Medal'].isin(MEDAL_TYPES), MEDAL_EVENT_KEY + ['region']]
+        keys, first = np.unique(_hashes(medal_df[MEDAL_EVENT_KEY]), return_index=True)
+        new = ~_seen_hashes(self._medal_keys, keys)
+        _fold(self._medal_keys, keys[new], _unique_hashes)
+        self._medal_counts = _add_counts(self._medal_counts, _medal_counts(medal_df.iloc[first[new]]))
+        
+        # Distinct values per year
+        if self.precision is not None:
+            for col in OVER_TIME_COLUMNS:
+                sketch = _build_year_sketch(chunk, col, self.precision, by_value=True)
+                if col in self._sketches:
+                    sketch = _merge_year_sketches(self._sketches[col], sketch)
+                self._sketches[col] = sketch
+        else:
+            for col, distinct in self._distinct.items():
+                values = chunk[['Year', col]].dropna()
+                hashes = _hashes(values[col])
+                for year, positions in values.groupby('Year').indices.items():
+                    _fold(distinct.setdefault(year, []), np.unique(hashes[positions]), _unique_hashes)
+        
+        # Medals per athlete and sport, as most_successful counts them
+        medal_rows = chunk.loc[chunk['Medal'].isin(MEDAL_TYPES), ['ID', 'Name', 'Sport', 'region']]
+        counts = _object_levels(medal_rows.groupby(['ID', 'Sport'], observed=True).size())
+        _fold(self._athlete_counts, counts, _sum_counts)
+        info = medal_rows.drop_duplicates()
+        _fold(self._athlete_info, info.astype({'Name': object, 'Sport': object, 'region': object}), _unique_rows)
+        return self
     
-    # Initialize medal columns if they don't exist
-    medal_df['Gold'] = 0
-    medal_df['Silver'] = 0
-    medal_df['Bronze'] = 0
+    def _cube(self):
+        counts = self._medal_counts
+        if counts is None:
+            index = pd.MultiIndex.from_arrays([[], [], []], names=['region', 'Year', 'Medal'])
+            counts = pd.Series([], index=index, dtype=np.int64)
+        return _cube_from_counts(counts)
     
-    # Update medal counts
-    medal_df.loc[medal_df['Medal'] == 'Gold', 'Gold'] = 1
-    medal_df.loc[medal_df['Medal'] == 'Silver', 'Silver'] = 1
-    medal_df.loc[medal_df['Medal'] == 'Bronze', 'Bronze'] = 1
+    def medal_tally(self):
+        regions = sorted(self.regions)
+        totals = self._cube().groupby(level='region').sum().reindex(regions, fill_value=0)
+        return _tally_frame(pd.Index(regions, dtype=object), totals.to_numpy())
     
-    # Drop duplicates (keeping only unique medal entries per event)
-    medal_df = medal_df.drop_duplicates(subset=['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal'])
+    def fetch_medal_tally(self, year, country):
+        cube = self._cube()
+        by_year = cube.swaplevel().sort_index()
+        return _fetch_from_cube(cube, by_year, cube.groupby(level='region').sum(), year, country)
     
-    # Group by region and sum medals
-    medal_tally = medal_df.groupby('region').sum()[['Gold', 'Silver', 'Bronze']].sort_values('Gold', ascending=False).reset_index()
+    def data_over_time(self, col):
+        # Only OVER_TIME_COLUMNS are tracked, in either mode
+        if col not in OVER_TIME_COLUMNS:
+            raise KeyError(col)
+        years = sorted(self.years)
+        if self.precision is not None:
+            if col not in self._sketches:
+                return pd.DataFrame({'Edition': years, 'Count': 0})
+            sketch_years, registers = self._sketches[col]
+            counts = pd.Series(_estimated_counts(registers), index=sketch_years).reindex(years, fill_value=0)
+            return pd.DataFrame({'Edition': years, 'Count': counts.to_numpy()})
+        
+        distinct = self._distinct[col]
+        counts = [len(_unique_hashes(distinct[year])) if year in distinct else 0 for year in years]
+        return pd.DataFrame({'Edition': years, 'Count': counts})
     
-    # Calculate total medals
-    medal_tally['Total'] = medal_tally['Gold'] + medal_tally['Silver'] + medal_tally['Bronze']
+    def most_successful(self, sport):
+        if not self._athlete_counts:
+            return pd.DataFrame(columns=['Name', 'Medals', 'Sport', 'region'])
+        
+        counts, info = _sum_counts(self._athlete_counts), _unique_rows(self._athlete_info).set_index('ID')
+        if sport == 'Overall':
+            counts = counts.groupby(level='ID').sum().nlargest(LEADERBOARD_SIZE)
+        else:
+            counts = _cube_slice(_top_k(counts.swaplevel().sort_index(), LEADERBOARD_SIZE), sport)
+            info = info[info['Sport'] == sport]
+        return _leaderboard_frame(counts, info)
+
+def medal_tally(df):
+    # Count medals per region in one bincount over region code x medal code of
+    # the deduplicated medal events; the compact schema orders the Medal
+    # categories as MEDAL_TYPES, so Gold/Silver/Bronze are codes 0/1/2
+    medal_df = medal_events(df)
+    regions = medal_df['region'].cat.categories
+    region_codes = medal_df['region'].cat.codes.to_numpy()
+    medal_codes = medal_df['Medal'].cat.codes.to_numpy()
     
-    # Ensure all medal columns are integers
-    medal_tally['Gold'] = medal_tally['Gold'].astype(int)
-    medal_tally['Silver'] = medal_tally['Silver'].astype(int)
-    medal_tally['Bronze'] = medal_tally['Bronze'].astype(int)
-    medal_tally['Total'] = medal_tally['Total'].astype(int)
+    # Events without a region are left out, as groupby drops missing keys
+    known = region_codes >= 0
+    cells = region_codes[known].astype(np.int64) * len(MEDAL_TYPES) + medal_codes[known]
+    counts = np.bincount(cells, minlength=len(regions) * len(MEDAL_TYPES)).reshape(len(regions), len(MEDAL_TYPES))
+    
+    # Every region is listed, including the ones that never won a medal
+    return _tally_frame(regions.astype(object), counts)
+
+def _tally_frame(regions, counts):
+    # Medal table of the regions from their Gold/Silver/Bronze counts
+    medal_tally = pd.DataFrame(counts.astype(int), columns=MEDAL_TYPES)
+    medal_tally.insert(0, 'region', regions)
+    medal_tally['Total'] = counts.sum(axis=1).astype(int)
+    medal_tally = medal_tally.sort_values('Gold', ascending=False, kind='stable', ignore_index=True)
     
     # Add additional statistics
     medal_tally['Gold_Ratio'] = (medal_tally['Gold'] / medal_tally['Total']).round(2)
@@ -56,30 +583,37 @@ def country_year_list(df):
     years.sort()
     years.insert(0, 'Overall')
     
-    country = np.unique(df['region'].dropna().values).tolist()
+    country = df['region'].dropna().unique().tolist()
     country.sort()
     country.insert(0, 'Overall')
     
     return years, country
 
 def fetch_medal_tally(df, year, country):
-    medal_df = df.drop_duplicates(subset=['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal'])
-    
+    return _fetch_from_cube(
+        _derived(df, 'medal_cube', _build_medal_cube),
+        _derived(df, 'medal_cube_by_year', _build_medal_cube_by_year),
+        _derived(df, 'region_medal_totals', _build_region_medal_totals),
+        year, country,
+    )
+
+def _fetch_from_cube(cube, cube_by_year, totals, year, country):
     flag = 0
     if year == 'Overall' and country == 'Overall':
-        temp_df = medal_df
+        x = totals
     if year == 'Overall' and country != 'Overall':
         flag = 1
-        temp_df = medal_df[medal_df['region'] == country]
+        x = _cube_slice(cube, country)
     if year != 'Overall' and country == 'Overall':
-        temp_df = medal_df[medal_df['Year'] == int(year)]
+        x = _cube_slice(cube_by_year, int(year))
     if year != 'Overall' and country != 'Overall':
-        temp_df = medal_df[(medal_df['Year'] == year) & (medal_df['region'] == country)]
+        x = _cube_slice(cube_by_year, int(year))
+        x = x[x.index == country]
     
     if flag == 1:
-        x = temp_df.groupby('Year').sum()[['Gold', 'Silver', 'Bronze']].sort_values('Year').reset_index()
+        x = x.sort_index().reset_index()
     else:
-        x = temp_df.groupby('region').sum()[['Gold', 'Silver', 'Bronze']].sort_values('Gold', ascending=False).reset_index()
+        x = x.sort_values('Gold', ascending=False).reset_index()
     
     x['Total'] = x['Gold'] + x['Silver'] + x['Bronze']
     x['Gold'] = x['Gold'].astype('int')
@@ -89,78 +623,457 @@ def fetch_medal_tally(df, year, country):
     
     return x
 
-def data_over_time(df, col):
-    # Count unique events per year
-    if col == 'Event':
-        # Count unique events per year
-        events_over_time = df.drop_duplicates(['Year', 'Event']).groupby('Year').count()['Event'].reset_index()
-        events_over_time.rename(columns={'Year': 'Edition', 'Event': 'Count'}, inplace=True)
-    else:
-        # For other columns, count unique entries
-        nations_over_time = df.drop_duplicates(['Year', col]).groupby('Year')[col].count().reset_index()
-        nations_over_time.rename(columns={'Year': 'Edition', col: 'Count'}, inplace=True)
+# Headline counts of the Overall Analysis page and the column each counts
+OVERALL_COLUMNS = {'cities': 'City', 'sports': 'Sport', 'events': 'Event', 'athletes': 'Name', 'nations': 'region'}
+
+def _distinct_by_year(year_codes, n_years, column, approximate=False):
+    # Distinct values of a categorical column per year, and which categories
+    # occur at all, from the set of (year, code) pairs; missing values are
+    # not counted
+    codes = column.cat.codes.to_numpy()
+    n_categories = len(column.cat.categories)
+    valid = codes >= 0
+    if n_years * n_categories <= 8 * len(codes):
+        seen = np.zeros((n_years, n_categories), dtype=bool)
+        seen[year_codes[valid], codes[valid]] = True
+        return seen.sum(axis=1), seen.any(axis=0)
+    
+    # Too many categories for a year x category table, e.g. athlete names.
+    # When approximate, the per-year counts are left to a sketch.
+    if approximate:
+        return None, np.bincount(codes[valid], minlength=n_categories) > 0
+    pairs = np.unique(year_codes[valid].astype(np.int64) * n_categories + codes[valid])
+    observed = np.zeros(n_categories, dtype=bool)
+    observed[pairs % n_categories] = True
+    return np.bincount(pairs // n_categories, minlength=n_years), observed
+
+def _build_overall_summary(df, precision=None):
+    # Everything the Overall Analysis page counts, in one pass over the codes.
+    # The categories seen and whether a value is missing are kept per column,
+    # so the counts of appended rows can be merged in.
+    year_codes, years = pd.factorize(df['Year'], sort=True)
+    summary = {'years': np.asarray(years), 'per_year': {}, 'observed': {}, 'missing': {}, 'sketched': set()}
+    for col in OVERALL_COLUMNS.values():
+        per_year, summary['observed'][col] = _distinct_by_year(year_codes, len(years), df[col], precision is not None)
+        if per_year is None:
+            summary['sketched'].add(col)
+            per_year = _estimated_counts(_year_sketch(df, col, precision)[1])
+        summary['per_year'][col] = per_year
+        summary['missing'][col] = bool(df[col].isna().any())
+    return _summary_counts(df, summary)
+
+def _summary_counts(df, summary):
+    # Headline counts and the sorted sport list from the categories seen;
+    # like unique(), a missing value counts as one more value
+    summary['counts'] = {'editions': len(summary['years'])}
+    for name, col in OVERALL_COLUMNS.items():
+        summary['counts'][name] = int(summary['observed'][col].sum()) + int(summary['missing'][col])
+    summary['sports'] = sorted(df['Sport'].cat.categories[summary['observed']['Sport']].astype(object))
+    return summary
+
+def overall_summary(df, error=None):
+    # Headline counts, the sorted sport list and per-year distinct counts.
+    # With an error bound, per-year counts too large for a year x category
+    # table are HyperLogLog estimates; the headline counts stay exact.
+    precision = None if error is None else hll_precision(error)
+    return _derived_entry(df, 'overall_summary', precision, _build_overall_summary)
+
+def data_over_time(df, col, error=None):
+    # Served from the overall summary for the columns it counts
+    summary = overall_summary(df, error)
+    if col in summary['per_year']:
+        return pd.DataFrame({'Edition': summary['years'], 'Count': summary['per_year'][col]})
+    
+    if error is not None:
+        years, registers = year_sketch(df, col, error)
+        return pd.DataFrame({'Edition': years, 'Count': _estimated_counts(registers)})
+    
+    # For other columns, count unique entries
+    over_time = df.drop_duplicates(['Year', col]).groupby('Year')[col].count().reset_index()
+    over_time.rename(columns={'Year': 'Edition', col: 'Count'}, inplace=True)
+    return over_time.sort_values('Edition')
+
+
+# Athletes kept per sport and per region in the leaderboards
+LEADERBOARD_SIZE = 15
+
+def _top_k(counts, k):
+    # The k largest counts of every group of a (group, key) count Series,
+    # ordered by group and descending count, ties in key order. A bincount
+    # of (group, count) gives the k-th largest count of every group, so only
+    # the counts reaching it are sorted rather than all of them.
+    codes, groups = pd.factorize(counts.index.get_level_values(0))
+    values = counts.to_numpy()
+    width = int(values.max()) + 1 if len(values) else 1
+    histogram = np.bincount(codes * width + values, minlength=len(groups) * width).reshape(len(groups), width)
+    at_least = histogram[:, ::-1].cumsum(axis=1)[:, ::-1]
+    threshold = np.maximum((at_least >= k).sum(axis=1) - 1, 0)
     
-    # Sort by Edition
-    result_df = nations_over_time.sort_values('Edition') if col != 'Event' else events_over_time
-    return result_df
+    keep = values >= threshold[codes]
+    top = counts[keep].iloc[np.lexsort((-values[keep], codes[keep]))]
+    top = top.groupby(level=0, sort=False).head(k)
+    top.index = top.index.remove_unused_levels()
+    return top
+
+def build_leaderboard(df):
+    # The leaders by medals per athlete keyed by ID, overall and per sport,
+    # with the name, sport and region rows of every medalist. The counts of
+    # all medalists are kept too, so appended rows can be added to them.
+    medal_rows = df.loc[df['Medal'].isin(MEDAL_TYPES), ['ID', 'Name', 'Sport', 'region']]
+    athlete_info = medal_rows.drop_duplicates().astype({'Name': object, 'Sport': object, 'region': object})
+    return _leaderboard(medal_rows.groupby('ID').size(),
+                        _object_levels(medal_rows.groupby(['Sport', 'ID'], observed=True).size()),
+                        athlete_info.set_index('ID').sort_index(kind='stable'))
+
+def _leaderboard(medals, sport_medals, athlete_info):
+    return {
+        'overall': medals.nlargest(LEADERBOARD_SIZE),
+        'by_sport': _top_k(sport_medals, LEADERBOARD_SIZE),
+        'athlete_info': athlete_info,
+        'medals': medals,
+        'sport_medals': sport_medals,
+    }
 
+def _leaderboard_frame(medal_counts, athlete_info):
+    # Leaders with their name, sport and region rows, most medals first
+    result = medal_counts.rename('Medals').reset_index().merge(athlete_info.reset_index(), on='ID', how='left')
+    result = result.sort_values('Medals', ascending=False, kind='stable').head(LEADERBOARD_SIZE)
+    return result[['Name', 'Medals', 'Sport', 'region']].reset_index(drop=True)
 
 def most_successful(df, sport):
-    # Filter for athletes with medals
-    temp_df = df.dropna(subset=['Medal'])
+    # Athletes with the most medals, overall or in one sport, sliced from the
+    # leaderboard instead of counting and sorting all medalists
+    leaderboard = _derived(df, 'leaderboard', build_leaderboard)
+    if sport == 'Overall':
+        medal_counts = leaderboard['overall']
+    else:
+        medal_counts = _cube_slice(leaderboard['by_sport'], sport)
     
-    # Filter by sport if selected
+    athlete_info = leaderboard['athlete_info'].loc[medal_counts.index]
     if sport != 'Overall':
-        temp_df = temp_df[temp_df['Sport'] == sport]
-    
-    # Count medals per athlete
-    medal_counts = temp_df.groupby('Name')['Medal'].count().reset_index()
-    medal_counts.rename(columns={'Medal': 'Medals'}, inplace=True)
+        athlete_info = athlete_info[athlete_info['Sport'] == sport]
+    return _leaderboard_frame(medal_counts, athlete_info)
+
+# Cell size of the binned height x weight counts, in cm and kg
+BODY_BIN_CM = 2
+BODY_BIN_KG = 2
+
+def build_body_stats(df):
+    # Height and weight of the athletes of every sport: the athlete rows with
+    # an index by sport, binned counts per sport and sex to plot in place of
+    # the points, and the summary statistics and correlation of each sport.
+    # An athlete is the first row of every name and region.
+    athletes = df.drop_duplicates(subset=['Name', 'region'])
+    athletes = athletes[['Name', 'Sport', 'Sex', 'Height', 'Weight', 'Medal', 'region']].reset_index(drop=True)
+    measured = athletes.dropna(subset=['Height', 'Weight'])
+    height = measured['Height'].to_numpy(dtype=np.float64)
+    weight = measured['Weight'].to_numpy(dtype=np.float64)
     
-    # Get athlete information
-    athlete_info = temp_df[['Name', 'Sport', 'region']].drop_duplicates()
+    # Counts of every occupied cell, keyed by the cell centre
+    cells = pd.DataFrame({
+        'Sport': measured['Sport'], 'Sex': measured['Sex'],
+        'Height': (np.floor(height / BODY_BIN_CM) + 0.5) * BODY_BIN_CM,
+        'Weight': (np.floor(weight / BODY_BIN_KG) + 0.5) * BODY_BIN_KG,
+    })
+    bins = _object_levels(cells.groupby(['Sport', 'Sex', 'Height', 'Weight'], observed=True).size())
     
-    # Merge medal counts with athlete information
-    result = medal_counts.merge(athlete_info, on='Name', how='left')
+    # Sums of the measured pairs per sport, for the Pearson correlation
+    sums = pd.DataFrame({
+        'Sport': measured['Sport'], 'n': 1, 'h': height, 'w': weight,
+        'hh': height * height, 'ww': weight * weight, 'hw': height * weight,
+    }).groupby('Sport', observed=True).sum()
+    sums.index = sums.index.astype(object)
     
-    # Sort by medal count and take top 15
-    result = result.sort_values('Medals', ascending=False).head(15)
+    summary = athletes.groupby('Sport', observed=True)[['Height', 'Weight']].describe()
+    return {
+        'athletes': athletes,
+        'sport_index': GroupIndex(athletes['Sport']),
+        'bins': bins,
+        'summary': summary.rename(index=str),
+        'sums': sums,
+        'corr': _body_corr(sums),
+    }
+
+def _body_corr(sums):
+    n = sums['n']
+    return (sums['hw'] - sums['h'] * sums['w'] / n) / np.sqrt(
+        (sums['hh'] - sums['h'] ** 2 / n) * (sums['ww'] - sums['w'] ** 2 / n))
+
+def height_weight(df, sport, max_points=None):
+    # Everything the Height vs Weight section shows for one sport. The
+    # measured athletes are returned as points up to max_points, else None,
+    # and the chart falls back to the binned counts.
+    body = _derived(df, 'body_stats', build_body_stats)
+    athletes = body['sport_index'].rows(body['athletes'], sport)
+    points = athletes.dropna(subset=['Height', 'Weight'])
+    if max_points is not None and len(points) > max_points:
+        points = None
     
-    return result
+    summary = body['summary']
+    if sport in summary.index:
+        summary = summary.loc[sport].unstack(0)
+    else:
+        summary = athletes[['Height', 'Weight']].describe()
+    return {
+        'athletes': athletes,
+        'points': points,
+        'bins': _cube_slice(body['bins'], sport).rename('Count').reset_index(),
+        'notable': athletes[athletes['Medal'] != 'No Medal'].head(5),
+        'summary': summary,
+        'corr': body['corr'].get(sport, np.nan),
+    }
 
-def yearwise_medal_tally(df, country):
-    temp_df = df.dropna(subset=['Medal'])
-    temp_df.drop_duplicates(subset=['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal'], inplace=True)
+def _participation_frame(counts, keys):
+    # Male/Female/Total columns and the female share from F/M counts
+    frame = pd.DataFrame(keys)
+    frame['Male'] = counts[:, 1]
+    frame['Female'] = counts[:, 0]
+    frame['Total'] = frame['Male'] + frame['Female']
+    frame['Female_Ratio'] = frame['Female'] / frame['Total'] * 100
+    return frame
+
+def _participation(df, by):
+    # Distinct athletes per year and sex, and per value of by if given. An
+    # athlete is a name and region, counted once per year (and value of by)
+    # with the sex of their first row, found in one hash pass over a single
+    # integer key rather than a multi-column drop_duplicates.
+    sex_codes = df['Sex'].astype(pd.CategoricalDtype(['F', 'M'])).cat.codes.to_numpy()
+    year_codes, years = pd.factorize(df['Year'], sort=True)
+    n_regions = len(df['region'].cat.categories) + 1
+    key = (df['Name'].cat.codes.to_numpy().astype(np.int64) + 1) * n_regions + df['region'].cat.codes.to_numpy() + 1
+    key = key * len(years) + year_codes
     
-    new_df = temp_df[temp_df['region'] == country]
-    final_df = new_df.groupby('Year').count()['Medal'].reset_index()
+    n_groups, group_codes = 1, np.zeros(len(df), dtype=np.int64)
+    if by is not None:
+        group_codes = df[by].cat.codes.to_numpy().astype(np.int64)
+        n_groups = len(df[by].cat.categories)
+        key = key * (n_groups + 1) + group_codes + 1
+    first = ~pd.Series(key).duplicated().to_numpy() & (sex_codes >= 0) & (group_codes >= 0)
     
-    return final_df
+    cells = (year_codes[first].astype(np.int64) * n_groups + group_codes[first]) * 2 + sex_codes[first]
+    counts = np.bincount(cells, minlength=len(years) * n_groups * 2).reshape(-1, 2)
+    present = counts.sum(axis=1) > 0
+    keys = {'Year': np.repeat(np.asarray(years), n_groups)[present]}
+    if by is not None:
+        keys[by] = np.tile(df[by].cat.categories.astype(object), len(years))[present]
+    return _participation_frame(counts[present], keys)
 
-def country_event_heatmap(df, country):
-    temp_df = df.dropna(subset=['Medal'])
-    temp_df = temp_df[temp_df['region'] == country]
+def gender_participation(df, by=None):
+    # Male, female and total athletes per year with the female share in
+    # percent; by='Season' or 'Sport' adds that breakdown. Each breakdown is
+    # built on first use.
+    return _derived_entry(df, 'participation', by, _participation)
+
+def build_top_athletes(df):
+    # Medal rows, medals by type and the age distribution of the overall
+    # leaders, for the Top Athletes section of the Athlete-wise page
+    leaders = _derived(df, 'leaderboard', build_leaderboard)['overall']
+    leader_rows = df.iloc[_derived(df, 'id_index', _build_id_index).positions_of(leaders.index)]
+    medal_rows = leader_rows.loc[leader_rows['Medal'].isin(MEDAL_TYPES),
+                                 ['ID', 'Name', 'Sport', 'region', 'Medal', 'Age', 'Year']]
+    medal_rows = medal_rows.astype({'Name': object, 'Sport': object, 'region': object, 'Medal': object})
     
-    pt = temp_df.pivot_table(index='Sport', columns='Year', values='Medal', aggfunc='count').fillna(0)
-    return pt
+    by_type = medal_rows.groupby(['ID', 'Medal']).size().unstack('Medal', fill_value=0)
+    athletes = by_type.reindex(index=leaders.index, columns=MEDAL_TYPES, fill_value=0)
+    athletes['Total'] = athletes.sum(axis=1)
+    names = medal_rows.drop_duplicates('ID').set_index('ID')[['Name', 'Sport', 'region']]
+    athletes = names.join(athletes, how='right').reset_index(drop=True)
+    return {
+        'medals': medal_rows.drop(columns='ID').reset_index(drop=True),
+        'athletes': athletes.sort_values('Total', ascending=False, kind='stable', ignore_index=True),
+        'age_histogram': _age_histogram(medal_rows['Age'].value_counts().sort_index()),
+    }
+
+def top_athletes(df):
+    return _derived(df, 'top_athletes', build_top_athletes)
+
+def yearwise_medal_tally(df, country):
+    return country_profile(df, country)['medals_by_year'].copy()
+
+def country_event_heatmap(df, country):
+    return country_profile(df, country)['sport_heatmap'].copy()
 
 def most_successful_countrywise(df, country):
-    # Get successful athletes from the country
-    temp_df = df.dropna(subset=['Medal'])
-    temp_df = temp_df[temp_df['region'] == country]
+    return country_profile(df, country)['top_athletes'].copy()
+
+def build_country_tables(df):
+    # Per-region counts behind the Country-wise page in long form: one
+    # vectorized pass each, and counts of two frames can simply be added
+    medal_rows = df.loc[df['Medal'].isin(MEDAL_TYPES), ['ID', 'Name', 'Sport', 'Year', 'region']]
+    athlete_info = medal_rows[['region', 'ID', 'Name', 'Sport']].dropna(subset=['region']).drop_duplicates()
+    athlete_info = athlete_info.astype({'region': object, 'Name': object, 'Sport': object})
+    return {
+        'sport_year': _object_levels(medal_rows.groupby(['region', 'Sport', 'Year'], observed=True).size()),
+        'athlete_medals': _object_levels(medal_rows.groupby(['region', 'ID'], observed=True).size()),
+        'athlete_info': athlete_info.set_index('region').sort_index(kind='stable'),
+        'age_counts': _object_levels(df.groupby(['region', 'Age'], observed=True).size()),
+    }
+
+def _merge_country_tables(tables, addition):
+    merged = {}
+    for name in ('sport_year', 'athlete_medals', 'age_counts'):
+        merged[name] = tables[name].add(addition[name], fill_value=0).astype(np.int64)
+    athlete_info = pd.concat([tables['athlete_info'], addition['athlete_info']])
+    athlete_info = athlete_info.reset_index().drop_duplicates().set_index('region').sort_index(kind='stable')
+    merged['athlete_info'] = athlete_info
+    return merged
+
+def _country_medal_series(df, country):
+    # Medal events per year, i.e. the row sums of the region's medal cube
+    medals = _cube_slice(_derived(df, 'medal_cube', _build_medal_cube), country).sum(axis=1)
+    return medals.rename('Medal').reset_index()
+
+def build_medal_tensor(df):
+    # Medal rows of every region, sport and year as one dense region x sport x
+    # year array with the labels of each axis. It has an extra all-zero
+    # region last, which the code -1 of an unknown region selects.
+    sport_year = _derived(df, 'country_tables', build_country_tables)['sport_year']
+    index = sport_year.index
+    levels = [index.unique(level).sort_values() for level in range(index.nlevels)]
+    codes = tuple(level.get_indexer(index.get_level_values(i)) for i, level in enumerate(levels))
+    counts = np.zeros((len(levels[0]) + 1, len(levels[1]), len(levels[2])), dtype=np.int32)
+    counts[codes] = sport_year.to_numpy()
+    return {'regions': levels[0], 'sports': levels[1], 'years': levels[2], 'counts': counts}
+
+def country_comparison(df, countries):
+    # Sport x year medal counts of each region, all on the sports and years
+    # in which any of them won a medal, sliced from the medal tensor at once
+    tensor = _derived(df, 'medal_tensor', build_medal_tensor)
+    stack = tensor['counts'][tensor['regions'].get_indexer(countries)]
+    sports = stack.any(axis=(0, 2))
+    years = stack.any(axis=(0, 1))
+    stack = stack[:, sports][:, :, years].astype(float)
+    index = pd.Index(tensor['sports'][sports], name='Sport')
+    columns = pd.Index(tensor['years'][years], name='Year')
+    return {country: pd.DataFrame(counts, index=index, columns=columns) for country, counts in zip(countries, stack)}
+
+def _country_heatmap(df, country):
+    return country_comparison(df, [country])[country]
+
+def _build_region_leaderboard(df):
+    return _top_k(_derived(df, 'country_tables', build_country_tables)['athlete_medals'], LEADERBOARD_SIZE)
+
+def _country_top_athletes(df, tables, country):
+    # Ten athletes with the most medals; each has at least one info row
+    medal_counts = _cube_slice(_derived(df, 'region_leaderboard', _build_region_leaderboard), country)
+    medal_counts = medal_counts.head(10).reset_index()
+    medal_counts.columns = ['ID', 'Total_Medals']
     
-    # Count medals per athlete
-    medal_counts = temp_df['Name'].value_counts().reset_index()
-    medal_counts.columns = ['Name', 'Total_Medals']
+    # A region without medals has no info rows to look up
+    if medal_counts.empty:
+        return pd.DataFrame(columns=['Name', 'Sport', 'Total_Medals'])
     
-    # Get sport information for each athlete
-    athlete_info = temp_df[['Name', 'Sport']].drop_duplicates()
+    # Get name and sport information for each athlete
+    athlete_info = tables['athlete_info'].loc[country:country]
     
     # Merge medal counts with athlete information
-    result = medal_counts.merge(athlete_info, on='Name', how='left')
+    result = medal_counts.merge(athlete_info, on='ID', how='left')
     result = result.head(10)
     
-    # Rename columns for clarity
-    result = result[['Name', 'Sport', 'Total_Medals']]
+    return result[['Name', 'Sport', 'Total_Medals']]
+
+# Density curves are evaluated like seaborn's kdeplot: a Gaussian kernel with
+# Scott's bandwidth on KDE_GRIDSIZE points reaching KDE_CUT bandwidths past
+# the data
+KDE_GRIDSIZE = 200
+KDE_CUT = 3
+
+def _weighted_quantiles(values, weights, q):
+    # Quantiles of the sample holding weights[i] copies of the sorted
+    # values[i], interpolated linearly like np.quantile
+    cumulative = weights.cumsum()
+    position = (cumulative[-1] - 1) * np.asarray(q, dtype=np.float64)
+    lower = np.floor(position)
+    below = values[np.searchsorted(cumulative, lower, side='right')]
+    above = values[np.minimum(np.searchsorted(cumulative, lower + 1, side='right'), len(values) - 1)]
+    return below + (position - lower) * (above - below)
+
+def _kde_curve(values, weights, std):
+    # Density of the weighted sample on its grid, one kernel per distinct
+    # value rather than per observation
+    n = weights.sum()
+    bandwidth = std * n ** (-1 / 5)
+    grid = np.linspace(values[0] - KDE_CUT * bandwidth, values[-1] + KDE_CUT * bandwidth, KDE_GRIDSIZE)
+    z = (grid[None, :] - values[:, None]) / bandwidth
+    density = weights @ np.exp(-z ** 2 / 2) / (n * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density
+
+def _age_histogram(age_counts, bins=20):
+    # Histogram, density curve and summary statistics from the count of every
+    # distinct age, which equal those of the raw ages
+    ages = age_counts.index.to_numpy(dtype=np.float64)
+    weights = age_counts.to_numpy()
+    counts, edges = np.histogram(ages, bins=bins, weights=weights)
+    n = int(weights.sum())
+    result = {'counts': counts, 'edges': edges, 'n': n, 'mean': np.nan, 'median': np.nan, 'std': np.nan,
+              'min': np.nan, 'max': np.nan, 'quartiles': np.full(3, np.nan),
+              'grid': np.array([]), 'density': np.array([])}
+    if n == 0:
+        return result
+    
+    mean = (ages * weights).sum() / n
+    std = np.sqrt(((ages - mean) ** 2 * weights).sum() / (n - 1)) if n > 1 else np.nan
+    quartiles = _weighted_quantiles(ages, weights, [0.25, 0.5, 0.75])
+    result.update(mean=mean, median=quartiles[1], std=std, min=ages[0], max=ages[-1], quartiles=quartiles)
     
-    return result
\ No newline at end of file
+    # Like kdeplot, no curve for a sample without spread
+    if std > 0:
+        result['grid'], result['density'] = _kde_curve(ages, weights, std)
+    return result
+
+def age_summary(histogram):
+    # The statistics Series.describe() gives for the raw ages
+    return pd.Series([histogram['n'], histogram['mean'], histogram['std'], histogram['min'],
+                      *histogram['quartiles'], histogram['max']],
+                     index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'], dtype=np.float64)
+
+# Columns whose values split the athletes into the age distribution segments
+AGE_SEGMENTS = ['Medal', 'Sex', 'Sport', 'region']
+
+def build_age_distributions(df):
+    # Age histogram and density of the athletes overall and of every segment,
+    # keyed (column, value) and (None, None) for all athletes; an athlete is
+    # the first row of every name and region, as the Athlete-wise page counts
+    athlete_df = df.drop_duplicates(subset=['Name', 'region'])
+    distributions = {(None, None): _age_histogram(athlete_df['Age'].value_counts().sort_index())}
+    for col in AGE_SEGMENTS:
+        age_counts = _object_levels(athlete_df.groupby([col, 'Age'], observed=True).size())
+        for value in age_counts.index.levels[0]:
+            distributions[col, value] = _age_histogram(_cube_slice(age_counts, value))
+    return distributions
+
+def age_distribution(df, col=None, value=None):
+    # Precomputed age histogram and density of one segment, or of all athletes
+    distributions = _derived(df, 'age_distributions', build_age_distributions)
+    if (col, value) not in distributions:
+        return _age_histogram(pd.Series([], dtype=np.int64))
+    return distributions[col, value]
+
+def build_country_profile(df, country):
+    tables = _derived(df, 'country_tables', build_country_tables)
+    return {
+        'medals_by_year': _country_medal_series(df, country),
+        'sport_heatmap': _country_heatmap(df, country),
+        'top_athletes': _country_top_athletes(df, tables, country),
+        'age_histogram': _age_histogram(_cube_slice(tables['age_counts'], country)),
+    }
+
+def build_country_profiles(df):
+    # Everything the Country-wise page shows, for every region, sliced from
+    # the country tables instead of scanning the frame per selection
+    return {region: build_country_profile(df, region) for region in df['region'].dropna().unique()}
+
+def country_profile_tables(df):
+    # The derived tables every country profile is sliced from, to build them
+    # once and install them wherever the profiles are built
+    return {
+        'country_tables': _derived(df, 'country_tables', build_country_tables),
+        'medal_cube': _derived(df, 'medal_cube', _build_medal_cube),
+        'medal_tensor': _derived(df, 'medal_tensor', build_medal_tensor),
+        'region_leaderboard': _derived(df, 'region_leaderboard', _build_region_leaderboard),
+    }
+
+def country_profile(df, country):
+    # Precomputed yearly medals, sport x year heatmap, top athletes and age
+    # histogram of one region, built on first use when missing
+    return _derived_entry(df, 'country_profiles', country, build_country_profile, build_country_profiles)
@@ -0,0 +1,196 @@
+import argparse
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from artifacts import load_artifacts, save_artifacts
+from helper import ChunkedSummary, preprocess_data, append_rows
+
+ATHLETE_CSV = 'athlete_events.csv'
+NOC_CSV = 'noc_regions.csv'
+CACHE_DIR = '.cache'
+ARTIFACT_NAME = 'olympics.arrow'
+
+# Bump whenever preprocess_data changes the columns or dtypes it produces, or
+# the derived tables change shape, so artifacts written by an older version
+# are rebuilt
+SCHEMA_VERSION = 7
+
+FINGERPRINT_KEY = b'olympics.fingerprint'
+
+# Set OLYMPICS_SHARED_DATASET=1 to map the artifact read-only instead of
+# copying it, so every server process shares the same page-cache pages
+SHARED_ENV = 'OLYMPICS_SHARED_DATASET'
+TRUTHY = ('1', 'true', 'yes', 'on')
+
+# Rows per batch in chunked mode; peak memory grows with this, not the file
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def artifact_path(cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, ARTIFACT_NAME)
+
+
+def source_fingerprint(athlete_path=ATHLETE_CSV, noc_path=NOC_CSV):
+    # Identify the inputs by name, size and modification time; two stat calls
+    # are cheap enough to run on every Streamlit rerun
+    digest = hashlib.sha1(f'schema={SCHEMA_VERSION}'.encode())
+    for path in (athlete_path, noc_path):
+        stat = os.stat(path)
+        digest.update(f'|{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    return digest.hexdigest()
+
+
+def artifact_fingerprint(path):
+    # Only the Arrow IPC footer is read, not the columns
+    try:
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    fingerprint = metadata.get(FINGERPRINT_KEY)
+    return fingerprint.decode() if fingerprint else None
+
+
+def build_artifact(athlete_path=ATHLETE_CSV, noc_path=NOC_CSV, cache_dir=CACHE_DIR, fingerprint=None):
+    if fingerprint is None:
+        fingerprint = source_fingerprint(athlete_path, noc_path)
+
+    athlete_df = pd.read_csv(athlete_path)
+    noc_df = pd.read_csv(noc_path)
+    df = preprocess_data(athlete_df, noc_df)
+    write_artifact(df, fingerprint, cache_dir)
+    return df
+
+
+def write_artifact(df, fingerprint, cache_dir=CACHE_DIR):
+    # Stamp the source fingerprint into the Arrow schema metadata
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[FINGERPRINT_KEY] = fingerprint.encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Write to a temporary file first so concurrent readers never see a partial
+    # artifact. A single uncompressed record batch lets map_artifact view
+    # every column in place.
+    path = artifact_path(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=max(len(df), 1))
+    os.replace(tmp_path, path)
+    df.attrs['fingerprint'] = fingerprint
+
+
+def _buffer_view(array):
+    # Read-only numpy view of the values buffer of a fixed-width Arrow array.
+    # Arrow keeps the values pandas wrote under null slots (NaN, code -1), so
+    # the view needs no fixing up.
+    dtype = np.dtype(array.type.to_pandas_dtype())
+    return np.frombuffer(array.buffers()[1], dtype=dtype, count=len(array), offset=array.offset * dtype.itemsize)
+
+
+def _map_column(column):
+    if column.num_chunks == 1:
+        array = column.chunk(0)
+        if pa.types.is_dictionary(array.type):
+            # Only the categories are copied; the codes stay in the mapping
+            categories = array.dictionary.to_pandas()
+            return pd.Categorical.from_codes(_buffer_view(array.indices), categories=categories, validate=False)
+        if pa.types.is_integer(array.type) or pa.types.is_floating(array.type):
+            return _buffer_view(array)
+    return column.to_pandas()
+
+
+def map_artifact(path):
+    # The artifact as a frame whose columns point into a read-only memory
+    # map of the file; the mapping stays open while any column references it
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    columns = {name: _map_column(table.column(name)) for name in table.column_names}
+    return pd.DataFrame(columns, copy=False)
+
+
+def shared_requested():
+    return os.environ.get(SHARED_ENV, '').lower() in TRUTHY
+
+
+def load_dataset(athlete_path=ATHLETE_CSV, noc_path=NOC_CSV, cache_dir=CACHE_DIR, shared=None):
+    if shared is None:
+        shared = shared_requested()
+    fingerprint = source_fingerprint(athlete_path, noc_path)
+    path = artifact_path(cache_dir)
+
+    # Rebuild from the CSVs only when they changed since the artifact was written
+    if artifact_fingerprint(path) != fingerprint:
+        df = build_artifact(athlete_path, noc_path, cache_dir, fingerprint)
+        if not shared:
+            return df
+
+    if shared:
+        df = map_artifact(path)
+    else:
+        df = feather.read_feather(path, memory_map=True)
+    df.attrs['fingerprint'] = fingerprint
+    return df
+
+
+def append_games(batch_path, athlete_path=ATHLETE_CSV, noc_path=NOC_CSV, cache_dir=CACHE_DIR):
+    # Add the athlete_events rows of new Games editions: the rows are appended
+    # to the source CSV and the artifacts are updated from the new rows
+    # instead of being rebuilt from the full history
+    df = load_artifacts(load_dataset(athlete_path, noc_path, cache_dir))
+    batch_df = pd.read_csv(batch_path)
+    columns = pd.read_csv(athlete_path, nrows=0).columns
+    missing = columns.difference(batch_df.columns)
+    if len(missing):
+        raise ValueError(f"{batch_path} lacks columns: {', '.join(missing)}")
+
+    # Validate and update everything before touching the CSV
+    df = append_rows(df, batch_df[columns], pd.read_csv(noc_path))
+    batch_df[columns].to_csv(athlete_path, mode='a', header=False, index=False)
+
+    fingerprint = source_fingerprint(athlete_path, noc_path)
+    write_artifact(df, fingerprint, cache_dir)
+    save_artifacts(df)
+    return df
+
+
+def summarize_csv(athlete_path=ATHLETE_CSV, noc_path=NOC_CSV, chunk_rows=DEFAULT_CHUNK_ROWS, error=None):
+    # Medal tallies, over-time counts and athlete counters of an athlete_events
+    # file too large to load, read and preprocessed chunk_rows rows at a time;
+    # with an error bound the over-time counts are estimated in fixed memory
+    if 'ID' not in pd.read_csv(athlete_path, nrows=0).columns:
+        raise ValueError(f'{athlete_path} has no ID column to key athletes across chunks')
+
+    noc_df = pd.read_csv(noc_path)
+    summary = ChunkedSummary(error)
+    with pd.read_csv(athlete_path, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            summary.add(preprocess_data(chunk, noc_df))
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the preprocessed dataset artifact')
+    parser.add_argument('--append', metavar='CSV',
+                        help='append the athlete_events rows of new Games editions from CSV')
+    parser.add_argument('--chunked', action='store_true',
+                        help='only print the medal tally, reading the CSV in chunks instead of building the artifact')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if args.chunked:
+        summary = summarize_csv(chunk_rows=args.chunk_rows)
+        print(f'{summary.rows:,} rows in chunks of {args.chunk_rows:,}')
+        print(summary.medal_tally().head(20).to_string(index=False))
+    else:
+        if args.append:
+            df = append_games(args.append)
+        else:
+            # Prebuild the artifact, e.g. as a deploy step before starting the app
+            df = build_artifact()
+        print(f"Wrote {artifact_path()} ({len(df):,} rows, fingerprint {df.attrs['fingerprint']})")
@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+from singleflight import SingleFlight
+
+# Size of the process-wide cache of helper results; the TTL is in seconds and
+# unset means entries only leave on eviction or when the dataset changes
+MEMO_ENTRIES_ENV = 'OLYMPICS_MEMO_ENTRIES'
+MEMO_MB_ENV = 'OLYMPICS_MEMO_MB'
+MEMO_TTL_ENV = 'OLYMPICS_MEMO_TTL'
+DEFAULT_MEMO_ENTRIES = 1024
+DEFAULT_MEMO_MB = 256
+
+# Compute times are kept for this many keys, least recently computed dropped first
+MAX_TIMINGS = 4096
+
+_MISSING = object()
+
+
+def sizeof(value):
+    # Approximate bytes held by a cached value
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class MemoCache:
+    # Values by key, shared by all threads of the process, bounded by entry
+    # count and by bytes and evicted least recently used first; with a ttl an
+    # entry also expires that many seconds after it was stored. Counts hits,
+    # misses, evictions and expirations and keeps the compute time of every
+    # key, so it can be sized from what it reports.
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, sizeof=sizeof):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flights = SingleFlight()
+        self._entries = OrderedDict()
+        self._timings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                self._pop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        nbytes = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes, time.monotonic())
+            self.size += nbytes
+            while ((self.max_entries is not None and len(self._entries) > self.max_entries)
+                   or (self.max_bytes is not None and self.size > self.max_bytes)):
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def compute(self, key, func, *args):
+        # The cached value of key, else func(*args) stored under key; callers
+        # missing the same key at once share one call
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.flights.do(key, self._compute, key, func, *args)
+        return value
+
+    def _compute(self, key, func, *args):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            # Stored by a call that finished since the caller looked
+            return entry[0]
+        start = time.perf_counter()
+        value = func(*args)
+        self._record(key, time.perf_counter() - start)
+        self.put(key, value)
+        return value
+
+    def _record(self, key, seconds):
+        with self._lock:
+            computes, total, _ = self._timings.pop(key, (0, 0.0, 0.0))
+            self._timings[key] = (computes + 1, total + seconds, seconds)
+            while len(self._timings) > MAX_TIMINGS:
+                self._timings.popitem(last=False)
+
+    def _pop(self, key):
+        self.size -= self._entries.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'coalesced': self.flights.coalesced,
+            }
+
+    def timings(self):
+        # Compute count, total and last compute time and cached size per key,
+        # slowest total first
+        with self._lock:
+            rows = [{'key': repr(key), 'computes': computes, 'total_ms': total * 1000, 'last_ms': last * 1000,
+                     'cached_bytes': self._entries[key][1] if key in self._entries else None}
+                    for key, (computes, total, last) in self._timings.items()]
+        frame = pd.DataFrame(rows, columns=['key', 'computes', 'total_ms', 'last_ms', 'cached_bytes'])
+        return frame.sort_values('total_ms', ascending=False, ignore_index=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._timings.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _env_number(name, default, parse):
+    value = os.environ.get(name)
+    return parse(value) if value else default
+
+
+helper_cache = MemoCache(
+    max_entries=_env_number(MEMO_ENTRIES_ENV, DEFAULT_MEMO_ENTRIES, int),
+    max_bytes=int(_env_number(MEMO_MB_ENV, DEFAULT_MEMO_MB, float) * 2 ** 20),
+    ttl=_env_number(MEMO_TTL_ENV, None, float),
+)
+
+
+def _key(value):
+    # Lists, e.g. of countries to compare, key the cache as the equal tuple
+    if isinstance(value, (list, tuple)):
+        return tuple(_key(v) for v in value)
+    return value
+
+
+def _copy(value):
+    # A copy of every frame, series and array in a result, also inside dicts,
+    # lists, tuples and sets, so callers never modify the cached value
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return type(value)(_copy(v) for v in value)
+    return value
+
+
+def memoize(func, cache=helper_cache):
+    # Cache the results of a helper func(df, *args) by function, arguments and
+    # dataset fingerprint. Frames without a fingerprint are not cached, since
+    # nothing tells their versions apart. Callers get their own copy of the
+    # frames in a result, as from the helper itself.
+
+    @wraps(func)
+    def cached(df, *args, **kwargs):
+        fingerprint = df.attrs.get('fingerprint')
+        if fingerprint is None:
+            return func(df, *args, **kwargs)
+        key = (func.__name__, fingerprint, _key(args), tuple(sorted((k, _key(v)) for k, v in kwargs.items())))
+        return _copy(cache.compute(key, lambda: func(df, *args, **kwargs)))
+
+    return cached
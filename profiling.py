@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+import pandas as pd
+import streamlit as st
+
+from loader import TRUTHY
+
+# Profiling is opt-in: set OLYMPICS_PROFILE=1 for the whole server or open the
+# app with ?profile=1 for a single session
+PROFILE_ENV = 'OLYMPICS_PROFILE'
+PROFILE_LOG_ENV = 'OLYMPICS_PROFILE_LOG'
+DEFAULT_PROFILE_LOG = os.path.join('.cache', 'render_profile.jsonl')
+
+_log_lock = threading.Lock()
+
+
+def profiling_requested():
+    if os.environ.get(PROFILE_ENV, '').lower() in TRUTHY:
+        return True
+    params = st.experimental_get_query_params()
+    return params.get('profile', [''])[0].lower() in TRUTHY
+
+
+class RenderProfile:
+    # Collects the timings of one script run. When disabled every method
+    # passes straight through, so app.py can call it unconditionally.
+
+    def __init__(self, enabled=None, log_path=None):
+        self.enabled = profiling_requested() if enabled is None else enabled
+        self.log_path = log_path or os.environ.get(PROFILE_LOG_ENV, DEFAULT_PROFILE_LOG)
+        self.page = None
+        self.records = []
+        self._started = time.perf_counter()
+
+    def record(self, kind, name, seconds):
+        if self.enabled:
+            self.records.append({'kind': kind, 'name': name, 'ms': round(seconds * 1000, 3)})
+
+    @contextmanager
+    def section(self, name, kind='section'):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - start)
+
+    def wrap(self, func):
+        # Time every call of a helper function
+        if not self.enabled:
+            return func
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            with self.section(func.__name__, kind='helper'):
+                return func(*args, **kwargs)
+
+        return timed
+
+    def summary(self):
+        frame = pd.DataFrame(self.records, columns=['kind', 'name', 'ms'])
+        return frame.sort_values('ms', ascending=False, ignore_index=True)
+
+    def finish(self, caches=None):
+        # Show the breakdown in the sidebar and append it to the log, with the
+        # counters of the given caches by name
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self._started
+        cache_stats = {name: cache.stats() for name, cache in (caches or {}).items()}
+        with st.sidebar.expander('⏱️ Render profile', expanded=True):
+            st.write(f'**{self.page}** rendered in {total * 1000:.0f} ms')
+            st.dataframe(self.summary(), hide_index=True, use_container_width=True)
+        if cache_stats:
+            with st.sidebar.expander('🗄️ Caches'):
+                st.dataframe(pd.DataFrame(cache_stats).T, use_container_width=True)
+                for name, cache in caches.items():
+                    st.write(f'Slowest {name} to compute')
+                    st.dataframe(cache.timings().head(20), hide_index=True, use_container_width=True)
+        self.write_log(total, cache_stats)
+
+    def write_log(self, total, cache_stats=None):
+        entry = {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'page': self.page,
+            'total_ms': round(total * 1000, 3),
+            'records': self.records,
+        }
+        if cache_stats:
+            entry['caches'] = cache_stats
+        line = json.dumps(entry) + '\n'
+        with _log_lock:
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            with open(self.log_path, 'a') as f:
+                f.write(line)
@@ -0,0 +1,69 @@
+import io
+import os
+from contextlib import nullcontext
+
+import matplotlib.pyplot as plt
+import streamlit as st
+from PIL import Image
+
+from memo import MemoCache
+
+# Size of the process-wide cache of rendered charts, in megabytes
+FIGURE_CACHE_ENV = 'OLYMPICS_FIGURE_CACHE_MB'
+DEFAULT_FIGURE_CACHE_MB = 64
+
+# Same output st.pyplot produces for a figure
+SAVEFIG_KWARGS = {'format': 'png', 'dpi': 200, 'bbox_inches': 'tight'}
+
+# Widest image st.image shows at column width (its MAXIMUM_CONTENT_WIDTH);
+# it decodes, resizes and re-encodes anything wider on every call
+DISPLAY_WIDTH = 2 * 730
+
+
+def lazy_tabs(labels, key):
+    # st.tabs runs the body of every tab on each rerun and only hides the
+    # inactive ones in the browser. A horizontal radio looks like a tab bar
+    # but returns the selected label, so the caller builds just that tab.
+    return st.radio('Section', labels, horizontal=True, key=key, label_visibility='collapsed')
+
+
+# Rendered PNG bytes by chart key, shared by all sessions of the process
+figure_cache = MemoCache(max_bytes=int(float(os.environ.get(FIGURE_CACHE_ENV, DEFAULT_FIGURE_CACHE_MB)) * 2 ** 20),
+                         sizeof=len)
+
+
+def figure_png(fig):
+    # Rasterize a figure and release it; pyplot keeps every open figure alive
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, **SAVEFIG_KWARGS)
+    finally:
+        plt.close(fig)
+    return display_png(buffer.getvalue())
+
+
+def display_png(png):
+    # Downscale to the displayed width once, before caching, the same way
+    # st.image would on every hit
+    image = Image.open(io.BytesIO(png))
+    if image.width <= DISPLAY_WIDTH:
+        return png
+    height = int(image.height * DISPLAY_WIDTH / image.width)
+    buffer = io.BytesIO()
+    image.resize((DISPLAY_WIDTH, height), resample=Image.BILINEAR).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _build_png(key, draw, section):
+    with section(key[0], 'figure_build'):
+        return figure_png(draw())
+
+
+def show_figure(key, draw, profile=None, cache=figure_cache):
+    # Show the chart identified by key, calling draw() to build its figure
+    # only when no rendered copy is cached or being drawn. key[0] names the
+    # chart.
+    section = profile.section if profile is not None else lambda name, kind: nullcontext()
+    png = cache.compute(key, _build_png, key, draw, section)
+    with section(key[0], 'figure_render'):
+        st.image(png, use_column_width=True)
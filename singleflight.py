@@ -0,0 +1,40 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    # Coalesces concurrent calls by key: while one thread computes a key,
+    # every other caller of that key waits for it and receives the same
+    # result object, or the same exception. Streamlit sessions and the query
+    # API both serve requests on threads, so a spike of identical requests
+    # costs one computation.
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args):
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
@@ -0,0 +1,69 @@
+import numpy as np
+
+# HyperLogLog distinct-count sketches over 64-bit value hashes. A sketch is a
+# uint8 array of 2**precision registers; sketches of several groups are the
+# rows of a 2-D array, and two sketches merge by taking np.maximum.
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+
+def hll_precision(error):
+    # Smallest precision whose relative standard error, 1.04 / sqrt(2**p),
+    # is at most error; errors below what MAX_PRECISION reaches are refused
+    # rather than silently loosened
+    if not error >= hll_error(MAX_PRECISION):
+        raise ValueError(f'error must be at least {hll_error(MAX_PRECISION):.4f}, got {error}')
+    precision = int(np.ceil(np.log2((1.04 / error) ** 2)))
+    return min(max(precision, MIN_PRECISION), MAX_PRECISION)
+
+
+def hll_error(precision):
+    return 1.04 / np.sqrt(2 ** precision)
+
+
+def _leading_zeros(values):
+    # Leading zero bits of uint64 values; each 32-bit half converts to float64
+    # exactly, so floor(log2) is exact
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    with np.errstate(divide='ignore'):
+        high_zeros = 31 - np.floor(np.log2(high))
+        low_zeros = 63 - np.floor(np.log2(low))
+    zeros = np.where(high > 0, high_zeros, np.where(low > 0, low_zeros, 64))
+    return zeros.astype(np.int64)
+
+
+def hll_registers(group_codes, n_groups, hashes, precision, codes=None):
+    # One sketch per group; group_codes gives the group of every item. hashes
+    # holds the hash of every item, or with codes the hash of every distinct
+    # value, codes giving the value of every item.
+    m = 1 << precision
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rank = np.minimum(_leading_zeros(hashes << np.uint64(precision)) + 1, 64 - precision + 1).astype(np.uint8)
+    if codes is not None:
+        index, rank = index[codes], rank[codes]
+    cells = group_codes.astype(np.int64) * m + index
+
+    # Write the items in increasing rank, one rank at a time, so every
+    # register ends up holding its largest rank; sorting uint8 is a radix sort
+    registers = np.zeros(n_groups * m, dtype=np.uint8)
+    order = np.argsort(rank, kind='stable')
+    cells, rank = cells[order], rank[order]
+    bounds = np.r_[0, np.flatnonzero(np.diff(rank)) + 1, len(rank)]
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        registers[cells[start:stop]] = rank[start]
+    return registers.reshape(n_groups, m)
+
+
+def hll_estimate(registers):
+    # Distinct-count estimate of every sketch along the last axis, with the
+    # linear-counting correction for small cardinalities
+    registers = np.asarray(registers)
+    m = registers.shape[-1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=-1)
+    empty = np.sum(registers == 0, axis=-1)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(empty, 1))
+    return np.where((raw <= 2.5 * m) & (empty > 0), linear, raw)
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import helper
+from bench import make_synthetic
+
+# Every table append_rows extends, and how the same table is built from
+# scratch; keyed tables are built for the keys the extended table kept
+REFERENCE = {
+    'medal_events': lambda df, table: helper._build_medal_events(df),
+    'medal_cube': lambda df, table: helper._build_medal_cube(df),
+    'medal_cube_by_year': lambda df, table: helper._build_medal_cube_by_year(df),
+    'region_medal_totals': lambda df, table: helper._build_region_medal_totals(df),
+    'country_tables': lambda df, table: helper.build_country_tables(df),
+    'country_profiles': lambda df, table: {region: helper.build_country_profile(df, region) for region in table},
+    'year_sketches': lambda df, table: {key: helper._build_year_sketch(df, *key) for key in table},
+    'overall_summary': lambda df, table: {precision: helper._build_overall_summary(df, precision) for precision in table},
+    'participation': lambda df, table: {by: helper._participation(df, by) for by in table},
+    'leaderboard': lambda df, table: helper.build_leaderboard(df),
+    'body_stats': lambda df, table: helper.build_body_stats(df),
+}
+
+
+def _warm(df):
+    # Build every table append_rows extends
+    helper.warm_derived(df)
+    helper.overall_summary(df, 0.02)
+    helper.year_sketch(df, 'Name', 0.02)
+    for by in (None, 'Season', 'Sport'):
+        helper.gender_participation(df, by)
+    helper.most_successful(df, 'Overall')
+    helper.height_weight(df, 'Sport 1')
+
+
+def _split(athlete_df, case):
+    # The base rows and the batch of new editions: the last Summer and Winter
+    # Games, or a Winter Games held in a year whose Summer Games are loaded
+    if case == 'new years':
+        games = athlete_df.drop_duplicates('Games').nlargest(2, 'Year')['Games']
+    else:
+        games = ['1992 Winter']
+    appended = athlete_df['Games'].isin(games)
+    return athlete_df[~appended].reset_index(drop=True), athlete_df[appended].reset_index(drop=True)
+
+
+@pytest.fixture(scope='module', params=['new years', 'shared year'])
+def appended(request):
+    # The appended frame and a full preprocess of the same rows, recoded to
+    # the appended frame's categories: new values are added after the old
+    # ones on append, and sketches and category masks are keyed by code
+    athlete_df, noc_df = make_synthetic(scale=0.02, seed=1)
+    base_rows, batch_rows = _split(athlete_df, request.param)
+    base = helper.preprocess_data(base_rows, noc_df)
+    _warm(base)
+    combined = helper.append_rows(base, batch_rows, noc_df)
+    full = helper.preprocess_data(pd.concat([base_rows, batch_rows], ignore_index=True), noc_df)
+    return combined, helper._align_categories(full, combined)
+
+
+def assert_same(left, right, path=''):
+    if isinstance(left, dict):
+        assert set(left) == set(right), path
+        for key in left:
+            assert_same(left[key], right[key], f'{path}/{key}')
+    elif isinstance(left, (list, tuple)):
+        assert len(left) == len(right), path
+        for i, (a, b) in enumerate(zip(left, right)):
+            assert_same(a, b, f'{path}/{i}')
+    elif isinstance(left, pd.DataFrame):
+        pd.testing.assert_frame_equal(left, right, check_dtype=False, obj=path)
+    elif isinstance(left, pd.Series):
+        pd.testing.assert_series_equal(left, right, check_dtype=False, obj=path)
+    elif isinstance(left, (np.ndarray, pd.Index)):
+        np.testing.assert_array_equal(left, right, err_msg=path)
+    elif isinstance(left, helper.GroupIndex):
+        assert_same(vars(left), vars(right), path)
+    else:
+        assert left == right or (pd.isna(left) and pd.isna(right)), path
+
+
+def test_every_extender_is_checked():
+    assert set(REFERENCE) == set(helper._EXTENDERS)
+
+
+def test_appended_rows_match_full_load(appended):
+    combined, full = appended
+    pd.testing.assert_frame_equal(combined, full, check_dtype=False)
+
+
+@pytest.mark.parametrize('name', list(REFERENCE))
+def test_extended_table_matches_full_build(appended, name):
+    combined, full = appended
+    table = helper._tables(combined).get(name)
+    assert table is not None, f'{name} was not carried over'
+    assert_same(table, REFERENCE[name](full, table), name)